@@ -0,0 +1,770 @@
+"""Bytecode compiler tests for Vyra"""
+
+import io
+import math
+import sys
+from io import StringIO
+
+import pytest
+
+from vyra.parser import VyraParser
+from vyra.logic_graph import NODE_KINDS, UNKNOWN_KIND, GraphNode, LogicGraph
+from vyra.interpreter import _NO_BUILTIN, BUILTINS, ExecutionContext, VyraInterpreter
+from vyra.bytecode import (
+    Compiler, OP_BINARY_FAST_CONST, OP_CALL_BUILTIN, OP_CALL_FUNCTION, OP_DUP_TOP, OP_ENTER_TRACE, OP_FOR_ITER, OP_JMP_IF_FALSE, OP_LOAD_CONST,
+    OP_MUL, OP_PRINT, OP_RETURN, OP_STORE_FAST,
+)
+from vyra.jit import HOT_LOOP_THRESHOLD
+
+
+class TestBytecode:
+    def setup_method(self):
+        self.parser = VyraParser()
+        self.interpreter = VyraInterpreter()
+
+    def build_graph(self, code: str) -> LogicGraph:
+        ast = self.parser.parse(code)
+        assert not self.parser.errors, f"Parse errors: {self.parser.errors}"
+
+        graph = LogicGraph()
+        graph.from_ast(ast)
+        return graph
+
+    def execute_code(self, code: str) -> str:
+        graph = self.build_graph(code)
+
+        old_stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.interpreter.execute(graph)
+            return sys.stdout.getvalue()
+        finally:
+            sys.stdout = old_stdout
+
+    def test_compile_produces_flat_code(self):
+        code = """
+Set i to 0.
+While i is less than 3:
+  Increment i.
+Display the value of i.
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+        ops = [op for op, _ in compiled.instructions]
+
+        assert OP_JMP_IF_FALSE in ops
+        assert ops[-1] == OP_RETURN
+        assert 'JMP_IF_FALSE' in compiled.disassemble()
+
+    def test_line_buffered_output_is_written_once_per_run(self):
+        class Terminal(io.BytesIO):
+            writes = 0
+
+            def write(self, data):
+                Terminal.writes += 1
+                return super().write(data)
+
+        raw = Terminal()
+        stream = io.TextIOWrapper(raw, encoding='utf-8', line_buffering=True)
+        old_stdout = sys.stdout
+        sys.stdout = stream
+        try:
+            self.interpreter.execute(self.build_graph("""
+Repeat 3 times:
+  Display "tick".
+            """))
+        finally:
+            sys.stdout = old_stdout
+
+        assert raw.getvalue() == b"tick\ntick\ntick\n"
+        assert Terminal.writes == 1
+        assert stream.line_buffering
+
+    def test_display_text_is_prebuilt(self):
+        code = """
+Set n to 2.
+Display "hello".
+Display "n is " followed by n followed by "!".
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+        prints = [arg for op, arg in compiled.instructions if op == OP_PRINT]
+
+        assert prints == [(0, "hello\n"), (2, "!\n")]
+        assert self.execute_code(code) == "hello\nn is 2!\n"
+
+    def test_for_loop_uses_for_iter(self):
+        code = """
+Create a list called xs with values [1, 2].
+For each x in xs:
+  Display x.
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+        ops = [op for op, _ in compiled.instructions]
+        slot, _, var_slot = compiled.instructions[ops.index(OP_FOR_ITER)][1]
+
+        # The item goes straight into x; the iterator has an anonymous slot
+        assert compiled.varnames[var_slot] == 'x'
+        assert compiled.varnames[slot].startswith('.')
+        assert ops[ops.index(OP_FOR_ITER) + 1] != OP_STORE_FAST
+
+    def test_nested_repeat_loops_keep_separate_counters(self):
+        code = """
+Set total to 0.
+Repeat 3 times:
+  Repeat 4 times:
+    Increment total.
+Display the value of total.
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            assert "12" in self.execute_code(code).splitlines()
+            assert self.interpreter._loop_iterators == {}
+
+    def test_break_out_of_nested_for_loops(self):
+        code = """
+Create a list called rows with values [1, 2, 3].
+Create a list called out.
+For each r in rows:
+  For each c in rows:
+    If c is greater than r:
+      Stop the loop.
+    Append r times c to out.
+Display the value of out.
+        """
+        assert self.execute_code(code).strip() == "[1, 2, 4, 3, 6, 9]"
+
+    def test_top_level_return_value(self):
+        code = """
+Set x to 6.
+Return x times 7.
+Display "unreachable".
+        """
+        graph = self.build_graph(code)
+        old_stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            result = self.interpreter.execute(graph)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = old_stdout
+
+        assert result == 42
+        assert "unreachable" not in output
+
+    def test_debug_mode_matches_compiled_output(self):
+        code = """
+Create a list called xs with values [1, 2, 3, 4].
+Set s to 0.
+For each x in xs:
+  If x is equal to 2:
+    Continue.
+  Add x to s.
+Display the value of s.
+        """
+        compiled_output = self.execute_code(code)
+
+        self.interpreter = VyraInterpreter(debug=True)
+        debug_output = self.execute_code(code)
+
+        assert compiled_output.strip() == "8"
+        assert "8" in debug_output.splitlines()
+
+    def test_variables_resolve_to_slots(self):
+        code = """
+Set a to 1.
+Set b to a plus 2.
+Display the value of b.
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+
+        assert compiled.varnames == ['a', 'b']
+        assert (OP_STORE_FAST, 1) in compiled.instructions
+
+    def test_undefined_variable_raises_name_error(self):
+        with pytest.raises(NameError, match="missing"):
+            self.execute_code("Display the value of missing.")
+
+    def test_unbound_locals_outside_the_program_are_not_renamed(self, monkeypatch):
+        def probe(args):
+            raise UnboundLocalError("cannot access local variable 'buffer'")
+
+        monkeypatch.setitem(BUILTINS, 'probe', probe)
+        with pytest.raises(UnboundLocalError, match="buffer"):
+            self.execute_code("Set x to call probe with 1.")
+
+    def test_function_locals_do_not_leak(self):
+        code = """
+Set x to 1.
+Create function bump that takes n:
+  Set x to n plus 10.
+  Return x.
+Call bump with 5.
+Display the value of x.
+        """
+        assert self.execute_code(code).strip() == "1"
+
+    def test_functions_do_not_see_their_callers_locals(self):
+        code = """
+Set scale to 3.
+Create function inner that takes n:
+  Return n times scale plus secret.
+Create function outer that takes n:
+  Set secret to 100.
+  Return call inner with n.
+Display call outer with 2.
+        """
+        for generate_python in (True, False):
+            self.interpreter.generate_python = generate_python
+            with pytest.raises(NameError, match="secret"):
+                self.execute_code(code)
+
+        shared = code.replace("Set scale to 3.", "Set scale to 3.\nSet secret to 1.")
+        for generate_python in (True, False):
+            self.interpreter.generate_python = generate_python
+            assert self.execute_code(shared).strip() == "7"
+
+    def test_constant_subtrees_are_folded(self):
+        code = """
+Set t to 3 times 60.
+Set s to call abs with 5 minus 9.
+Display t.
+        """
+        compiler = Compiler(BUILTINS, self.interpreter._is_truthy)
+        compiled = compiler.compile(self.build_graph(code))
+        ops = [op for op, _ in compiled.instructions]
+
+        assert OP_MUL not in ops
+        assert compiled.instructions[0] == (OP_LOAD_CONST, 180)
+        assert self.execute_code(code).strip() == "180"
+
+    def test_repeated_subexpression_computed_once(self):
+        code = """
+Set x to 4.
+Set z to x times 2 plus x times 2.
+Display the value of z.
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+        ops = [op for op, _ in compiled.instructions]
+
+        assert ops.count(OP_BINARY_FAST_CONST) == 1
+        assert OP_DUP_TOP in ops
+        assert self.execute_code(code).strip() == "16"
+
+    def test_compiled_code_is_cached_per_graph(self):
+        graph = self.build_graph("Set x to 1.\nDisplay the value of x.")
+
+        first = self.interpreter._compile(graph)
+        assert self.interpreter._compile(graph) is first
+
+        graph.add_node('output', {'expressions': [{'type': 'literal', 'value': 2}]})
+        assert self.interpreter._compile(graph) is not first
+
+    def test_truthiness_rules(self):
+        is_truthy = self.interpreter._is_truthy
+
+        assert is_truthy("yes") and not is_truthy("No") and not is_truthy("0")
+        assert not is_truthy("FALSE") and not is_truthy("") and is_truthy("falsey")
+        assert not is_truthy(0.0) and is_truthy(-1)
+        assert not is_truthy(None) and not is_truthy([]) and is_truthy([0])
+
+    def test_variable_op_number_uses_single_instruction(self):
+        code = """
+Set i to 0.
+While i is less than 5:
+  Increment i.
+Display the value of i.
+        """
+        compiled = Compiler().compile(self.build_graph(code))
+        fast_ops = [arg for op, arg in compiled.instructions if op == OP_BINARY_FAST_CONST]
+
+        assert [(slot, symbol, const) for slot, symbol, const, _ in fast_ops] == [(0, '<', 5), (0, '+', 1)]
+        assert 'i < 5' in compiled.disassemble()
+        assert self.execute_code(code).strip() == "5"
+
+    def test_loop_iterators_are_not_variables(self):
+        code = """
+Create a list called xs with values [1, 2].
+For each x in xs:
+  Display x.
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            self.execute_code(code)
+            assert sorted(self.interpreter.context.variables()) == ['x', 'xs']
+
+    def test_branch_targets_are_precomputed(self):
+        graph = self.build_graph("""
+Set i to 0.
+While i is less than 3:
+  Increment i.
+Display i.
+        """)
+        loop = next(node for node in graph.nodes.values() if node.type == 'while')
+        edge_types = {dst: edge_type for src, dst, edge_type in graph.edges if src == loop.id}
+
+        assert edge_types[loop.else_next] == 'exit'
+        assert edge_types[loop.then_next] != 'exit'
+
+    def test_and_or_short_circuit(self):
+        code = """
+Create function shout that takes x:
+  Display "called".
+  Return x.
+Set a to 0.
+Set b to 1.
+If a and call shout with 1:
+  Display "and".
+If b or call shout with 0:
+  Display "or".
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            output = self.execute_code(code)
+            assert "called" not in output
+            assert "or" in output.splitlines()
+
+    def test_constant_and_or_operands_short_circuit_when_folded(self):
+        def literal(value):
+            return {'type': 'literal', 'value': value}
+
+        call = {'type': 'function_call', 'function': 'shout', 'arguments': []}
+        x = {'type': 'variable', 'name': 'x'}
+        compiler = Compiler(BUILTINS, self.interpreter._is_truthy)
+
+        folded = compiler.fold({'type': 'logical_op', 'operator': 'and', 'operands': [literal(0), call]})
+        assert folded.value is False
+        folded = compiler.fold({'type': 'logical_op', 'operator': 'or', 'operands': [x, literal(0), literal(1), call]})
+        assert [type(o).__name__ for o in folded.operands] == ['Load', 'Const']
+        folded = compiler.fold({'type': 'logical_op', 'operator': 'and', 'operands': [literal(1), x]})
+        assert [type(o).__name__ for o in folded.operands] == ['Load']
+
+    def test_numeric_looking_input_is_converted(self, monkeypatch):
+        answers = iter(["-12", "3.5", "1-2", "abc"])
+        monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+
+        assert [self.interpreter._read_input("", 'string') for _ in range(4)] == [-12, 3.5, "1-2", "abc"]
+
+    def test_node_args_hold_handler_fields(self):
+        graph = self.build_graph('Set x to 5.\nDisplay "hi".')
+        by_type = {node.type: node for node in graph.nodes.values()}
+
+        assert by_type['assignment'].args == ('x', by_type['assignment'].data['value'])
+        assert by_type['output'].args[1] is True
+        assert by_type['assignment'].next_id == by_type['output'].id
+        assert by_type['exit'].next_id is None
+
+    def test_builtin_calls_are_resolved_at_compile_time(self):
+        code = """
+Create function twice that takes n:
+  Return n times 2.
+Set s to "abc".
+Set a to call upper with s.
+Set b to call twice with 4.
+Display a.
+Display b.
+        """
+        compiled = Compiler(BUILTINS).compile(self.build_graph(code))
+        calls = [(op, arg[0]) for op, arg in compiled.instructions if op in (OP_CALL_BUILTIN, OP_CALL_FUNCTION)]
+
+        assert calls == [(OP_CALL_BUILTIN, 'upper'), (OP_CALL_FUNCTION, 'twice')]
+        assert self.execute_code(code).split() == ["ABC", "8"]
+
+    def test_hot_loops_are_traced(self):
+        code = """
+Set i to 0.
+Set total to 0.
+While i is less than 200:
+  Set total to total plus i times 2.
+  Increment i.
+Display the value of total.
+        """
+        self.interpreter.generate_python = False
+        graph = self.build_graph(code)
+        assert self.execute_code(code).strip() == "39800"
+
+        self.interpreter.execute(graph)
+        ops = [op for op, _ in self.interpreter._compile(graph).instructions]
+        assert OP_ENTER_TRACE in ops
+
+    def test_trace_deoptimizes_on_unbound_variable(self):
+        code = """
+Set i to 0.
+While i is less than 100:
+  Increment i.
+  If i is greater than 80:
+    Display the value of missing.
+        """
+        self.interpreter.generate_python = False
+        with pytest.raises(NameError, match="missing"):
+            self.execute_code(code)
+
+    def test_traced_negative_constants_keep_their_sign(self):
+        code = f"""
+Set n to 0.
+Set t to 0.
+Repeat {HOT_LOOP_THRESHOLD + 10} times:
+  Set n to n plus 1.
+  Set t to -2 to the power of n.
+Display t.
+        """
+        expected = str((-2) ** (HOT_LOOP_THRESHOLD + 10))
+        assert self.execute_code(code).strip() == expected
+
+        self.interpreter.generate_python = False
+        assert self.execute_code(code).strip() == expected
+
+    def test_program_runs_as_generated_python(self):
+        code = """
+Set total to 0.
+Repeat 3 times:
+  Repeat 4 times:
+    Increment total.
+Display the value of total.
+        """
+        graph = self.build_graph(code)
+        source = Compiler(BUILTINS).emit_python(graph)
+
+        assert 'for _ in _repeat(3):' in source
+        assert self.execute_code(code).strip() == "12"
+        assert self.interpreter._compile_python(graph).source == source
+        assert self.interpreter.context.variables() == {'total': 12}
+
+    def test_generated_python_calls_math_builtins_directly(self):
+        code = """
+Set s to 0.
+Set i to 0.
+While i is less than 4:
+  Set s to s plus call sqrt with i.
+  Increment i.
+Display the value of s.
+        """
+        compiler = Compiler(BUILTINS)
+        source = compiler.emit_python(self.build_graph(code))
+
+        assert math.sqrt in compiler.python_globals.values()
+        assert '([i])' not in source
+        assert float(self.execute_code(code)) == pytest.approx(1 + 2 ** 0.5 + 3 ** 0.5)
+
+    def test_generated_python_functions_see_globals(self):
+        code = """
+Set base to 10.
+Create function add_base that takes n:
+  Return n plus base.
+Set r to call add_base with 5.
+Display the value of r.
+        """
+        assert self.execute_code(code).strip() == "15"
+
+    def test_generated_python_stops_runaway_loops(self):
+        self.interpreter.max_iterations = 50
+        with pytest.raises(RuntimeError, match="maximum iterations"):
+            self.execute_code("Set i to 0.\nWhile i is less than 10:\n  Display i.")
+
+    def test_program_and_function_loops_share_the_iteration_limit(self):
+        code = """
+Create function f that takes a:
+  Repeat 1 times:
+    Set a to a plus 1.
+  Return a.
+Repeat 6 times:
+  Call f with 1.
+        """
+        for generate_python in (True, False):
+            self.interpreter.generate_python = generate_python
+            self.interpreter.max_iterations = 10
+            with pytest.raises(RuntimeError, match="maximum iterations"):
+                self.execute_code(code)
+            self.interpreter.max_iterations = 12
+            self.execute_code(code)
+
+    def test_iterations_are_counted_at_loop_back_edges(self):
+        code = """
+Set i to 0.
+Display "a".
+Display "b".
+Display "c".
+While i is less than 3:
+  Increment i.
+Display the value of i.
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            self.interpreter.max_iterations = 3
+            assert "3" in self.execute_code(code).splitlines()
+
+            self.interpreter.max_iterations = 2
+            with pytest.raises(RuntimeError, match="maximum iterations"):
+                self.execute_code(code)
+
+    def test_walker_expressions_match_vm(self):
+        code = """
+Set z to 0.
+Set d to 7 divided by z.
+Set m to 7 modulo z.
+Display d.
+Display m.
+If z or d:
+  Display "either".
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            lines = [line for line in self.execute_code(code).splitlines() if not line.startswith('[DEBUG]')]
+            assert lines == ["inf", "0", "either"]
+
+    def test_repeated_subexpressions_are_shared_across_recursion(self):
+        code = """
+Create function f that takes n:
+  If n is less than 1:
+    Return 0.
+  Set m to n minus 1.
+  Return n times 2 plus n times 2 plus call f with m.
+Set r to call f with 3.
+Display the value of r.
+        """
+        for debug in (False, True):
+            self.interpreter = VyraInterpreter(debug=debug)
+            lines = [line for line in self.execute_code(code).splitlines()
+                     if not line.startswith('[DEBUG]')]
+            assert lines == ["24"]
+
+    def test_function_bodies_unwind_nested_loops(self):
+        code = """
+Create function f that takes n:
+  Set total to 0.
+  Set i to 0.
+  While i is less than n:
+    Increment i.
+    If i is equal to 2:
+      Continue.
+    Repeat 2 times:
+      Set total to total plus i.
+    If i is greater than 6:
+      Break.
+    For each x in [10, 20]:
+      If x is equal to 20:
+        Continue.
+      Set total to total plus x.
+  If total is greater than 1000:
+    Return 0.
+  Return total.
+Set r to call f with 100.
+Display the value of r.
+        """
+        assert self.execute_code(code).strip() == "102"
+
+    def test_functions_are_registered_before_the_program_runs(self):
+        code = """
+Set r to call double with 4.
+Display the value of r.
+Create function double that takes n:
+  Return n times 2.
+        """
+        graph = self.build_graph(code)
+        assert Compiler(BUILTINS).emit_python(graph).count('define_function') == 0
+
+        for generate_python in (True, False):
+            self.interpreter.generate_python = generate_python
+            assert self.execute_code(code).strip() == "8"
+            assert list(self.interpreter.context.functions) == ['double']
+
+    def test_arithmetic_repeat_bodies_run_as_kernels(self):
+        body = [
+            {'type': 'assignment', 'variable': 'i', 'value': {
+                'type': 'binary_op', 'operator': '+', 'left': {'type': 'variable', 'name': 'i'},
+                'right': {'type': 'literal', 'value': 1}}},
+        ]
+        source, names, assigned = Compiler(BUILTINS).emit_repeat_kernel(body)
+        assert 'for _ in _range(_count):' in source
+        assert names == assigned == ['i']
+        source, _, _ = Compiler(BUILTINS).emit_repeat_kernel(body, unroll=3)
+        assert 'for ' not in source and source.count('i = (i + 1)') == 3
+        assert Compiler(BUILTINS).emit_repeat_kernel(body + [{'type': 'return', 'value': None}]) is None
+
+        code = """
+Create function work that takes n:
+  Set s to 0.
+  Repeat 5 times:
+    Set s to s plus n.
+    Set fresh to s.
+  Repeat 4 times:
+    Set s to s times 2.
+  Return s plus fresh.
+Set r to call work with 3.
+Display r.
+        """
+        assert self.execute_code(code).strip() == "255"
+
+        self.interpreter.max_iterations = 6
+        with pytest.raises(RuntimeError, match="maximum iterations"):
+            self.execute_code(code)
+
+    def test_kernel_variables_do_not_shadow_builtins(self):
+        code = """
+Create function f that takes range:
+  Set s to 0.
+  Repeat 20 times:
+    Set s to s plus range.
+  Return s.
+Set r to call f with 3.
+Display r.
+        """
+        assert self.execute_code(code).strip() == "60"
+
+    def test_for_each_bodies_in_functions_run_as_kernels(self):
+        body = [{'type': 'assignment', 'variable': 's',
+                 'value': {'type': 'binary_op', 'operator': '+',
+                           'left': {'type': 'variable', 'name': 's'},
+                           'right': {'type': 'variable', 'name': 'x'}}}]
+        source, names, assigned = Compiler(BUILTINS).emit_repeat_kernel(body, 'x')
+        assert 'for x in _count:' in source
+        assert names == ['s'] and assigned == ['x', 's']
+
+        code = """
+Create function total that takes xs:
+  Set s to 0.
+  For each x in xs:
+    Set s to s plus x times x.
+  Return s plus x.
+Set r to call total with [1, 2, 3].
+Display r.
+        """
+        assert self.execute_code(code).strip() == "17"
+
+        self.interpreter.max_iterations = 2
+        with pytest.raises(RuntimeError, match="maximum iterations"):
+            self.execute_code(code)
+
+    def test_recursion_reaches_the_call_depth_limit(self):
+        code = """
+Create function down that takes n:
+  If n is less than 1:
+    Return 0.
+  Set m to n minus 1.
+  Set r to call down with m.
+  Return r plus 1.
+Set r to call down with 199.
+Display r.
+        """
+        assert self.execute_code(code).strip() == "199"
+
+    def test_function_frames_copy_the_slot_layout(self):
+        context = ExecutionContext(['x'])
+        context.define_function('f', ['a'], [], ['a', 'b'])
+        layout = context.functions['f']['slots']
+
+        context.push_scope(['a', 'b'], layout)
+        context.set_variable('extra', 1)
+        assert context.get_variable('extra') == 1
+        assert layout == {'a': 0, 'b': 1}
+
+    def test_every_handled_node_type_has_a_kind(self):
+        handlers = self.interpreter._node_handlers
+        assert set(handlers) <= set(NODE_KINDS)
+        for node_type, kind in NODE_KINDS.items():
+            assert self.interpreter._kind_handlers[kind] == handlers.get(node_type, self.interpreter._execute_node)
+        assert GraphNode(0, 'mystery', {}).kind == UNKNOWN_KIND
+
+    def test_execution_context_has_fixed_attributes(self):
+        context = ExecutionContext()
+        assert not hasattr(context, '__dict__')
+        with pytest.raises(AttributeError):
+            context.scopes = []
+
+    def test_break_and_continue_targets_are_precomputed(self):
+        graph = self.build_graph("""
+Set i to 0.
+While i is less than 5:
+  Increment i.
+  If i is equal to 2:
+    Continue.
+  If i is equal to 4:
+    Stop the loop.
+Display i.
+        """)
+        by_type = {node.type: node for node in graph.nodes.values()}
+
+        assert by_type['continue'].next_id == by_type['while'].id
+        assert graph.nodes[by_type['break'].next_id].type == 'loop_exit'
+
+    def test_missing_builtin_is_not_a_none_result(self):
+        assert self.interpreter._call_builtin('sleep', [0]) is None
+        assert self.interpreter._call_builtin('no_such_builtin', []) is _NO_BUILTIN
+
+    def test_leaf_loops_in_functions_count_iterations_locally(self):
+        assert VyraInterpreter._is_leaf_body([{'type': 'print', 'value': {'type': 'function_call', 'function': 'sqrt'}}])
+        assert not VyraInterpreter._is_leaf_body([{'type': 'expression', 'value': {'type': 'function_call', 'function': 'f'}}])
+        assert not VyraInterpreter._is_leaf_body([{'type': 'if', 'then': [{'type': 'while'}]}])
+
+        code = """
+Create function spin that takes n:
+  Set i to 0.
+  While i is less than n:
+    Increment i.
+    If i is equal to 3:
+      Stop the loop.
+  Return i.
+Set r to call spin with 10.
+Display r.
+        """
+        assert self.execute_code(code).strip() == "3"
+        assert self.interpreter.iteration_count == 3
+
+        self.interpreter.max_iterations = 2
+        with pytest.raises(RuntimeError, match="maximum iterations"):
+            self.execute_code(code)
+        assert self.interpreter.iteration_count == 3
+
+    def test_function_invokers_are_resolved_once_per_run(self):
+        code = """
+Create function sq that takes a:
+  Return a times a.
+Set t to call sq with 3.
+Set t to t plus call sq with 4.
+Display t.
+        """
+        assert self.execute_code(code).strip() == "25"
+        invoke = self.interpreter._calls['sq']
+        assert self.interpreter._call_function('sq', [5]) == 25
+        assert self.interpreter._calls['sq'] is invoke
+        assert self.interpreter._call_function('abs', [-2]) == 2
+
+        self.execute_code(code)
+        assert self.interpreter._calls['sq'] is not invoke
+        with pytest.raises(NameError, match="not defined"):
+            self.interpreter._call_function('missing', [])
+
+    def test_consecutive_assignments_run_as_one_step(self):
+        self.interpreter.context = ExecutionContext()
+        assign = lambda name, value: {'type': 'assignment', 'variable': name,
+                                      'value': {'type': 'literal', 'value': value}}
+        body = self.interpreter._compile_body([assign('a', 1), assign('b', 2), assign('c', 3)])
+
+        assert body.__name__ == 'assign_all'
+        assert body(self.interpreter.context) is None
+        assert [self.interpreter.context.get_variable(n) for n in 'abc'] == [1, 2, 3]
+
+    def test_for_each_in_functions_stores_the_iterator_slot(self):
+        code = """
+Create function show that takes xs:
+  For each x in xs:
+    Display x.
+  Return x.
+Set r to call show with ["a", "b"].
+Display r.
+        """
+        assert self.execute_code(code).split() == ["a", "b", "b"]
+
+    def test_loops_with_empty_bodies_only_count_passes(self):
+        interpreter = self.interpreter
+        interpreter.context = ExecutionContext()
+        repeat = interpreter._compile_statement({'type': 'repeat', 'count': {'type': 'literal', 'value': 4}, 'body': []})
+        for_each = interpreter._compile_statement({
+            'type': 'for_each', 'iterator': 'x', 'body': [],
+            'iterable': {'type': 'list_literal', 'elements': [{'type': 'literal', 'value': v} for v in (1, 2, 3)]}})
+
+        assert repeat(interpreter.context) is None and interpreter.iteration_count == 4
+        assert for_each(interpreter.context) is None and interpreter.iteration_count == 7
+        assert interpreter.context.get_variable('x') == 3
+
+        interpreter.max_iterations = 9
+        with pytest.raises(RuntimeError, match="maximum iterations"):
+            repeat(interpreter.context)
@@ -1,7 +1,8 @@
 """Unit tests for Vyra parser."""
 
+import re
 import pytest
-from vyra.parser import VyraParser
+from vyra.parser import VyraParser, parse, _Captures
 from vyra.ast_nodes import *
 
 
@@ -223,6 +224,148 @@ While i is less than or equal to 5:
         assert isinstance(ast.statements[3], AssignmentNode)
         assert isinstance(ast.statements[4], WhileLoopNode)
 
+    
+    def test_action_patterns_are_precompiled(self):
+        """Test that statement patterns are compiled once per parser"""
+        for entries in self.parser.action_patterns.values():
+            for pattern, action_type in entries:
+                assert pattern.flags & re.IGNORECASE
+        
+        ast = self.parser.parse("SET x TO the value of y.")
+        assert isinstance(ast.statements[0].value, VariableNode)
+        assert ast.statements[0].value.name == "y"
+    
+    def test_combined_action_regex_keeps_pattern_order(self):
+        """Test that the single action regex picks the first pattern that matches"""
+        lines = ["Add 5 to items", "Add a and b and store in c", "Create function f that takes a:",
+                 "Call f with 2 and store the result in r", "Return", "Store 3 in x"]
+        for line in lines:
+            first = next(action for pattern, action in self.parser._actions if pattern.match(line))
+            action_re, actions, _ = self.parser._actions_for(line.split()[0].lower())
+            found = action_re.match(line)
+            assert actions[int(found.lastgroup[1:])][1] == first
+    
+    def test_combined_match_groups_are_renumbered(self):
+        """Test that a pattern's groups read from the combined match like its own match"""
+        lines = ["Create a list called items", "Create a list called items with values 1, 2",
+                 "Call f and store the result in r", "Otherwise:", "Ask the user for name"]
+        for line in lines:
+            action_re, _, spans = self.parser._actions_for(line.split()[0].lower())
+            found = action_re.match(line)
+            start, end, action = spans[found.lastgroup]
+            captures = _Captures.of(found.groups()[start:end])
+            pattern = next(p for p, a in self.parser._actions if p.match(line))
+            alone = pattern.match(line)
+            assert captures.captured == alone.groups()
+            assert captures.lastindex == alone.lastindex
+    
+    def test_repeated_expressions_are_parsed_once(self):
+        """Test that identical expression text reuses the parsed node, except calls"""
+        code = """
+Set a to x plus 1.
+Set b to x plus 1.
+Set c to call f with 2.
+Set d to call f with 2.
+        """
+        a, b, c, d = self.parser.parse(code).statements
+        assert a.value is b.value
+        assert c.value is not d.value
+        assert (c.value.line_number, d.value.line_number) == (3, 4)
+    
+    def test_common_statements_match_like_the_action_patterns(self):
+        """Test that the hand-written matchers agree with the regex patterns"""
+        lines = ["Set total to 3 plus 4", "Display x followed by y", "Increment count by 2",
+                 "display = 5", "Set x to tomatoes", "Stop", "continue", "Exit", "return"]
+        for line in lines:
+            first_word = line.split()[0].lower()
+            found = self.parser._match_common_statement(first_word, line)
+            action_re, actions, _ = self.parser._actions_for(first_word)
+            pattern, action = actions[int(action_re.match(line).lastgroup[1:])]
+            if found is not None:
+                assert found[0] == action
+                assert found[1].captured == pattern.match(line).groups()
+        
+        assert self.parser._match_common_statement('display', "display = 5") is None
+        assert self.parser._match_common_statement('set', "Set x to") is None
+        assert self.parser._match_common_statement('stop', "Stop")[0] == 'break'
+        assert self.parser._match_common_statement('stop', "Stop the loop") is None
+    
+    def test_common_literals_share_one_node(self):
+        """Test that increments, zero/one and booleans reuse singleton literals"""
+        code = """
+Increment a.
+Increment b.
+Set c to true.
+Set d to yes.
+Set e to 1.
+        """
+        a, b, c, d, e = self.parser.parse(code).statements
+        assert a.value.right is b.value.right is e.value
+        assert c.value is d.value and c.value.value is True
+        assert self.parser._parse_expression("10").value == 10
+        assert self.parser._parse_expression("[]") is self.parser._parse_expression("[ ]")
+    
+    def test_arithmetic_precedence_and_grouping(self):
+        """Test that operators group by precedence, then left to right, and split outside quotes"""
+        value = self.parser._parse_expression("a plus b minus c")
+        assert value.operator == '-' and value.left.operator == '+'
+        
+        value = self.parser._parse_expression("a minus b minus c")
+        assert value.operator == '-' and value.left.operator == '-'
+        assert isinstance(value.right, VariableNode) and value.right.name == 'c'
+        
+        value = self.parser._parse_expression("a times b to the power of 2 plus 1")
+        assert value.operator == '+' and value.left.operator == '*'
+        assert value.left.right.operator == '**'
+        
+        value = self.parser._parse_expression('"a plus b" plus x')
+        assert value.operator == '+' and value.left.value == 'a plus b'
+        assert isinstance(self.parser._parse_expression("address"), VariableNode)
+        
+        condition = self.parser._parse_condition("x IS GREATER THAN OR EQUAL TO 3")
+        assert condition.operator == '>='
+    
+    def test_nodes_have_slots(self):
+        """Test that AST nodes keep their fields in slots, without a __dict__"""
+        statement = self.parser.parse("Set x to 1 plus y.").statements[0]
+        assert not hasattr(statement, '__dict__')
+        assert not hasattr(statement.value, '__dict__')
+        assert statement == AssignmentNode(NodeType.ASSIGNMENT, statement.line_number,
+                                           variable_name='x', value=statement.value)
+    
+    def test_parse_reuses_one_parser_per_thread(self):
+        """Test that parse() keeps a parser per thread and reports its errors"""
+        import threading
+        from vyra import parser as parser_module
+        
+        program, errors = parse("Set x to 1.\nFrobnicate.")
+        assert len(program.statements) == 1 and errors
+        first = parser_module._thread_parsers.parser
+        assert parse("Set y to 2.")[1] == []
+        assert parser_module._thread_parsers.parser is first
+        
+        seen = []
+        thread = threading.Thread(target=lambda: (parse("Set z to 3."), seen.append(parser_module._thread_parsers.parser)))
+        thread.start()
+        thread.join()
+        assert seen and seen[0] is not first
+    
+    def test_arithmetic_statements(self):
+        """Test the operator, operands and target of the arithmetic statements"""
+        code = """
+Subtract 2 from total.
+Divide a by b and store the result in r.
+Add minus and b and store in c.
+Times a and b and store result in c.
+        """
+        subtract, divide, add, times = self.parser.parse(code).statements
+        assert (subtract.variable_name, subtract.value.operator) == ('total', '-')
+        assert subtract.value.left.name == 'total' and subtract.value.right.value == 2
+        assert (divide.variable_name, divide.value.operator) == ('r', '/')
+        assert isinstance(divide.value.right, VariableNode)
+        # The operator comes from the first word, not from the variable names
+        assert add.value.operator == '+' and add.value.left.name == 'minus'
+        assert times.value.operator == '*'
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
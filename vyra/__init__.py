@@ -4,7 +4,7 @@ __version__ = "1.0.0"
 __author__ = "Vyra Contributors"
 __license__ = "MIT"
 
-from .parser import VyraParser
+from .parser import VyraParser, parse
 from .interpreter import VyraInterpreter
 from .logic_graph import LogicGraph
 from .ai_rewriter import rewrite_source, AiRewriteError, AiRewriteConfig
@@ -12,6 +12,7 @@ from .ai_rewriter import rewrite_source, AiRewriteError, AiRewriteConfig
 __all__ = [
 
     "VyraParser",
+    "parse",
     "VyraInterpreter",
     "LogicGraph",
     "rewrite_source",
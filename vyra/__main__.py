@@ -3,6 +3,7 @@
 import sys
 import os
 import argparse
+import traceback
 from pathlib import Path
 from rich.console import Console
 from rich.syntax import Syntax
@@ -88,7 +89,6 @@ def run_file(filepath: str, debug: bool = False, visualize: bool = False, ai: bo
     except Exception as e:
         console.print(f"[bold red]❌ Error:[/bold red] {str(e)}")
         if debug:
-            import traceback
             console.print("[red]" + traceback.format_exc() + "[/red]")
         return 1
 
@@ -146,7 +146,7 @@ def repl(ai: bool = False):
             
             if not line_buffer and line.lower() == 'vars':
                 console.print("[cyan]Variables:[/cyan]")
-                for var, value in interpreter.context.scopes[-1].items():
+                for var, value in interpreter.context.variables().items():
                     if not var.startswith('__'):
                         console.print(f"  {var} = {value}")
                 continue
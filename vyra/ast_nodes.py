@@ -3,11 +3,26 @@
 These nodes represent the abstract syntax tree after parsing.
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from typing import Any, List, Optional, Dict
 from enum import Enum
 
 
+def node(cls):
+    """@dataclass, rebuilt with __slots__ for the fields the class declares
+
+    Parsing allocates nodes by the thousand; without a per-instance __dict__
+    they are about half the size. (dataclass(slots=True) needs Python 3.10.)
+    """
+    cls = dataclass(cls)
+    declared = cls.__dict__.get('__annotations__', {})
+    own = tuple(f.name for f in fields(cls) if f.name in declared)
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in own and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = own
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
 class NodeType(Enum):
     """Types of AST nodes"""
     # Literals
@@ -60,7 +75,7 @@ class NodeType(Enum):
     BLOCK = "block"
 
 
-@dataclass
+@node
 class ASTNode:
     """Base class for all AST nodes"""
     node_type: NodeType
@@ -71,7 +86,7 @@ class ASTNode:
         return f"{self.__class__.__name__}(type={self.node_type})"
 
 
-@dataclass
+@node
 class LiteralNode(ASTNode):
     """Literal values (numbers, strings, booleans)"""
     value: Any = None
@@ -80,7 +95,7 @@ class LiteralNode(ASTNode):
         return f"Literal({self.value})"
 
 
-@dataclass
+@node
 class VariableNode(ASTNode):
     """Variable reference"""
     name: str = ""
@@ -89,7 +104,7 @@ class VariableNode(ASTNode):
         return f"Variable({self.name})"
 
 
-@dataclass
+@node
 class AssignmentNode(ASTNode):
     """Variable assignment: Set x to 5"""
     variable_name: str = ""
@@ -99,7 +114,7 @@ class AssignmentNode(ASTNode):
         return f"Assignment({self.variable_name} = {self.value})"
 
 
-@dataclass
+@node
 class BinaryOpNode(ASTNode):
     """Binary operations: add, subtract, multiply, divide"""
     operator: str = ""  # +, -, *, /, %, **
@@ -110,7 +125,7 @@ class BinaryOpNode(ASTNode):
         return f"BinaryOp({self.left} {self.operator} {self.right})"
 
 
-@dataclass
+@node
 class ComparisonNode(ASTNode):
     """Comparison: x is greater than 5"""
     operator: str = ""  # ==, !=, <, >, <=, >=
@@ -121,7 +136,7 @@ class ComparisonNode(ASTNode):
         return f"Comparison({self.left} {self.operator} {self.right})"
 
 
-@dataclass
+@node
 class LogicalOpNode(ASTNode):
     """Logical operations: and, or, not"""
     operator: str = ""  # and, or, not
@@ -131,7 +146,7 @@ class LogicalOpNode(ASTNode):
         return f"LogicalOp({self.operator} {self.operands})"
 
 
-@dataclass
+@node
 class IfStatementNode(ASTNode):
     """If-else statement"""
     condition: ASTNode = None
@@ -143,7 +158,7 @@ class IfStatementNode(ASTNode):
         return f"If({self.condition})"
 
 
-@dataclass
+@node
 class WhileLoopNode(ASTNode):
     """While loop"""
     condition: ASTNode = None
@@ -153,7 +168,7 @@ class WhileLoopNode(ASTNode):
         return f"While({self.condition})"
 
 
-@dataclass
+@node
 class ForLoopNode(ASTNode):
     """For-each loop"""
     iterator_var: str = ""
@@ -164,7 +179,7 @@ class ForLoopNode(ASTNode):
         return f"For({self.iterator_var} in {self.iterable})"
 
 
-@dataclass
+@node
 class RepeatLoopNode(ASTNode):
     """Repeat N times loop"""
     count: ASTNode = None
@@ -174,7 +189,7 @@ class RepeatLoopNode(ASTNode):
         return f"Repeat({self.count})"
 
 
-@dataclass
+@node
 class FunctionDefNode(ASTNode):
     """Function definition"""
     name: str = ""
@@ -185,7 +200,7 @@ class FunctionDefNode(ASTNode):
         return f"FunctionDef({self.name}({', '.join(self.parameters)}))"
 
 
-@dataclass
+@node
 class FunctionCallNode(ASTNode):
     """Function call"""
     function_name: str = ""
@@ -195,7 +210,7 @@ class FunctionCallNode(ASTNode):
         return f"FunctionCall({self.function_name})"
 
 
-@dataclass
+@node
 class ReturnNode(ASTNode):
     """Return statement"""
     value: Optional[ASTNode] = None
@@ -204,7 +219,7 @@ class ReturnNode(ASTNode):
         return f"Return({self.value})"
 
 
-@dataclass
+@node
 class InputNode(ASTNode):
     """Get user input"""
     prompt: str = ""
@@ -215,7 +230,7 @@ class InputNode(ASTNode):
         return f"Input({self.prompt})"
 
 
-@dataclass
+@node
 class OutputNode(ASTNode):
     """Display output"""
     expressions: List[ASTNode] = field(default_factory=list)
@@ -225,7 +240,7 @@ class OutputNode(ASTNode):
         return f"Output({len(self.expressions)} items)"
 
 
-@dataclass
+@node
 class FileReadNode(ASTNode):
     """Read from file"""
     filepath: ASTNode = None
@@ -236,7 +251,7 @@ class FileReadNode(ASTNode):
         return f"FileRead({self.filepath})"
 
 
-@dataclass
+@node
 class FileWriteNode(ASTNode):
     """Write to file"""
     filepath: ASTNode = None
@@ -247,7 +262,7 @@ class FileWriteNode(ASTNode):
         return f"FileWrite({self.filepath})"
 
 
-@dataclass
+@node
 class ListAccessNode(ASTNode):
     """Access list element"""
     list_var: ASTNode = None
@@ -257,7 +272,7 @@ class ListAccessNode(ASTNode):
         return f"ListAccess({self.list_var}[{self.index}])"
 
 
-@dataclass
+@node
 class ListAppendNode(ASTNode):
     """Append to list"""
     list_var: ASTNode = None
@@ -267,7 +282,7 @@ class ListAppendNode(ASTNode):
         return f"ListAppend({self.list_var}.append({self.value}))"
 
 
-@dataclass
+@node
 class DictAccessNode(ASTNode):
     """Access dictionary value"""
     dict_var: ASTNode = None
@@ -277,7 +292,7 @@ class DictAccessNode(ASTNode):
         return f"DictAccess({self.dict_var}[{self.key}])"
 
 
-@dataclass
+@node
 class DictSetNode(ASTNode):
     """Set dictionary value"""
     dict_var: ASTNode = None
@@ -288,7 +303,7 @@ class DictSetNode(ASTNode):
         return f"DictSet({self.dict_var}[{self.key}] = {self.value})"
 
 
-@dataclass
+@node
 class BlockNode(ASTNode):
     """Block of statements"""
     statements: List[ASTNode] = field(default_factory=list)
@@ -297,7 +312,7 @@ class BlockNode(ASTNode):
         return f"Block({len(self.statements)} statements)"
 
 
-@dataclass
+@node
 class ProgramNode(ASTNode):
     """Root program node"""
     statements: List[ASTNode] = field(default_factory=list)
@@ -306,13 +321,13 @@ class ProgramNode(ASTNode):
         return f"Program({len(self.statements)} statements)"
 
 
-@dataclass
+@node
 class BreakNode(ASTNode):
     """Break from loop"""
     pass
 
 
-@dataclass
+@node
 class ContinueNode(ASTNode):
     """Continue to next iteration"""
     pass
@@ -0,0 +1,1212 @@
+"""Vyra Bytecode - Flat instruction stream for logic graphs.
+
+Lowers a LogicGraph into a linear list of (opcode, argument) instructions so the
+interpreter can run programs with a single dispatch loop instead of walking
+graph nodes and expression dictionaries.
+"""
+
+import keyword
+import math
+import operator
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .logic_graph import LogicGraph, GraphNode
+
+
+# Opcodes (indices into the interpreter's handler table)
+OP_LOAD_CONST = 0
+OP_LOAD_FAST = 1
+OP_STORE_FAST = 2
+OP_POP_TOP = 3
+OP_ADD = 4
+OP_SUB = 5
+OP_MUL = 6
+OP_DIV = 7
+OP_MOD = 8
+OP_POW = 9
+OP_EQ = 10
+OP_NE = 11
+OP_LT = 12
+OP_GT = 13
+OP_LE = 14
+OP_GE = 15
+OP_JMP_IF_FALSE_OR_POP = 16
+OP_JMP_IF_TRUE_OR_POP = 17
+OP_NOT = 18
+OP_BUILD_LIST = 19
+OP_CALL_FUNCTION = 20
+OP_JMP = 21
+OP_JMP_IF_FALSE = 22
+OP_GET_ITER = 23
+OP_GET_REPEAT_ITER = 24
+OP_FOR_ITER = 25
+OP_PRINT = 26
+OP_INPUT = 27
+OP_READ_FILE = 28
+OP_WRITE_FILE = 29
+OP_LIST_APPEND = 30
+OP_RETURN = 31
+OP_DUP_TOP = 32
+OP_BINARY_FAST_CONST = 33
+OP_CALL_BUILTIN = 34
+OP_JUMP_BACKWARD = 35
+OP_ENTER_TRACE = 36
+
+OPNAMES = {
+    value: name for name, value in globals().items()
+    if name.startswith('OP_') and isinstance(value, int)
+}
+NUM_OPCODES = len(OPNAMES)
+
+BINARY_OPCODES = {
+    '+': OP_ADD, '-': OP_SUB, '*': OP_MUL,
+    '/': OP_DIV, '%': OP_MOD, '**': OP_POW,
+}
+
+COMPARISON_OPCODES = {
+    '==': OP_EQ, '!=': OP_NE, '<': OP_LT,
+    '>': OP_GT, '<=': OP_LE, '>=': OP_GE,
+}
+
+# Python equivalents of the arithmetic/comparison opcodes, used to fold
+# literal-only subtrees at compile time. They must match the VM handlers.
+FOLD_OPERATORS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': lambda a, b: a / b if b != 0 else float('inf'),
+    '%': lambda a, b: a % b if b != 0 else 0,
+    '**': operator.pow,
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+}
+
+# Constant operand types that select the variable-op-constant fast path
+NUMERIC_TYPES = (int, float)
+
+# Built-ins without side effects that may be evaluated at compile time
+PURE_BUILTINS = frozenset({
+    'len', 'length', 'str', 'to_string', 'string', 'int', 'to_int',
+    'float', 'to_float', 'type_of', 'abs', 'round', 'floor', 'ceil',
+    'sqrt', 'sin', 'cos', 'tan', 'log', 'exp', 'uppercase', 'upper',
+    'lowercase', 'lower', 'substring', 'replace',
+})
+
+# Only immutable results may become shared constants
+FOLDABLE_TYPES = (bool, int, float, str)
+
+Instruction = Tuple[int, Any]
+
+_NOT_CONSTANT = object()
+
+
+def _append_to(lst: Any, value: Any) -> list:
+    """Append for generated Python: like LIST_APPEND, a non-list becomes a new list"""
+    if not isinstance(lst, list):
+        lst = []
+    lst.append(value)
+    return lst
+
+
+# Globals every generated Python program can use. Generated code only refers
+# to underscore names, so program variables never shadow them.
+PYTHON_HELPERS = {
+    '_div': FOLD_OPERATORS['/'],
+    '_mod': FOLD_OPERATORS['%'],
+    '_text': lambda value: value if type(value) is str else str(value),
+    '_repeat': lambda count: range(int(count)),
+    '_range': range,
+    '_discard': lambda *values: None,
+    '_append_to': _append_to,
+    '_locals': locals,
+}
+
+
+def is_python_name(name: str) -> bool:
+    """Whether a variable can be a local of a generated Python program"""
+    return (isinstance(name, str) and name.isidentifier() and not keyword.iskeyword(name)
+            and not name.startswith('_'))
+
+
+class _Unstructured(Exception):
+    """Raised when a graph's control flow has no Python equivalent"""
+
+
+class CodeObject:
+    """Compiled form of a logic graph"""
+
+    def __init__(self, instructions: List[Instruction], node_offsets: Dict[int, int],
+                 varnames: List[str]):
+        self.instructions = instructions
+        self.node_offsets = node_offsets  # graph node id -> first instruction
+        self.varnames = varnames  # slot index -> variable name
+        self.nlocals = len(varnames)
+
+    def disassemble(self) -> str:
+        """Human-readable listing of the instruction stream"""
+        starts = {pc: node_id for node_id, pc in self.node_offsets.items()}
+        lines = []
+        for pc, (op, arg) in enumerate(self.instructions):
+            marker = f"n{starts[pc]:<4}" if pc in starts else "     "
+            arg_text = '' if arg is None else repr(arg)
+            if op in (OP_LOAD_FAST, OP_STORE_FAST, OP_GET_ITER, OP_GET_REPEAT_ITER):
+                arg_text += f" ({self.varnames[arg]})"
+            elif op == OP_FOR_ITER:
+                slot, exit_pc, var_slot = arg
+                arg_text = f"{slot} ({self.varnames[slot]}) -> {exit_pc}"
+                if var_slot is not None:
+                    arg_text += f", store {var_slot} ({self.varnames[var_slot]})"
+            elif op == OP_CALL_BUILTIN:
+                arg_text = repr(arg[:2])
+            elif op == OP_JUMP_BACKWARD:
+                arg_text = f"{arg[0]} (hits {arg[1]})"
+            elif op == OP_ENTER_TRACE:
+                arg_text = f"-> {arg[3]} (was {OPNAMES[arg[1]]})"
+            elif op == OP_BINARY_FAST_CONST:
+                slot, symbol, const, _ = arg
+                arg_text = f"{slot} ({self.varnames[slot]} {symbol} {const!r})"
+            lines.append(f"{marker}{pc:>5}  {OPNAMES[op]:<24}{arg_text}")
+        return '\n'.join(lines)
+
+    def __len__(self):
+        return len(self.instructions)
+
+    def __repr__(self):
+        return f"CodeObject({len(self.instructions)} instructions)"
+
+
+class Resolver:
+    """
+    Assigns a frame slot to every variable name a program uses.
+
+    The main graph runs in the global frame, so each name it reads or writes
+    gets a fixed slot there. Function bodies get their own frame layout:
+    parameters first, then every name the body assigns.
+    """
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}
+
+    def slot(self, name: str) -> int:
+        """Return the slot for name, allocating one on first use"""
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.slots)
+        return slot
+
+    @property
+    def varnames(self) -> List[str]:
+        return list(self.slots)
+
+    def resolve(self, graph: LogicGraph) -> Dict[str, int]:
+        """Allocate slots for the graph's names in program order"""
+        for node_id in sorted(graph.nodes):
+            data = graph.nodes[node_id].data
+            for key in ('variable', 'iterator'):
+                if isinstance(data.get(key), str):
+                    self.slot(data[key])
+            for key in ('value', 'condition', 'iterable', 'count', 'filepath',
+                        'content', 'list'):
+                self._resolve_expression(data.get(key))
+            for expr in data.get('expressions', ()):
+                self._resolve_expression(expr)
+            for expr in data.get('arguments', ()):
+                self._resolve_expression(expr)
+        return self.slots
+
+    def _resolve_expression(self, expr: Optional[Dict]):
+        if not isinstance(expr, dict):
+            return
+        if expr.get('type') == 'variable':
+            self.slot(expr['name'])
+            return
+        for key in ('left', 'right'):
+            self._resolve_expression(expr.get(key))
+        for key in ('operands', 'elements', 'arguments'):
+            for sub in expr.get(key, ()):
+                self._resolve_expression(sub)
+
+    @staticmethod
+    def names_read(value: Any) -> set:
+        """Every variable name read anywhere in serialized statements or expressions"""
+        names = set()
+        if isinstance(value, dict):
+            if value.get('type') == 'variable':
+                names.add(value.get('name'))
+            for item in value.values():
+                names |= Resolver.names_read(item)
+        elif isinstance(value, list):
+            for item in value:
+                names |= Resolver.names_read(item)
+        return names
+
+    @staticmethod
+    def function_varnames(params: List[str], body: List[Dict]) -> List[str]:
+        """Frame layout for a serialized function body"""
+        names = dict.fromkeys(params)
+
+        def visit(statements):
+            for stmt in statements or ():
+                for key in ('variable', 'iterator'):
+                    if isinstance(stmt.get(key), str):
+                        names.setdefault(stmt[key])
+                for key in ('then', 'else', 'body'):
+                    visit(stmt.get(key))
+
+        visit(body)
+        return list(names)
+
+    @staticmethod
+    def function_definitions(graph: LogicGraph) -> List[Tuple[str, List[str], List[Dict], List[str]]]:
+        """(name, params, body, frame layout) for each function the graph defines, in source order"""
+        definitions = []
+        for node in graph.nodes.values():
+            if node.type == 'function_def':
+                name, params, body = node.args
+                definitions.append((name, params, body, Resolver.function_varnames(params, body)))
+        return definitions
+
+
+class Compiler:
+    """
+    Compiles a LogicGraph into a CodeObject.
+
+    Nodes are laid out by following each node's fall-through successor, so
+    straight-line code needs no jumps; branch targets are queued and emitted
+    afterwards. Expression dictionaries are flattened into postfix order after
+    literal-only subtrees are folded into constants and repeated subtrees are
+    computed once into a scratch slot.
+    """
+
+    def __init__(self, builtins: Optional[Dict[str, Callable[[List[Any]], Any]]] = None,
+                 is_truthy: Optional[Callable[[Any], bool]] = None):
+        self.builtins = builtins or {}  # lowercased name -> function taking the argument list
+        self.is_truthy = is_truthy
+        self.instructions: List[List[Any]] = []
+        self.node_offsets: Dict[int, int] = {}
+        self.pending_jumps: List[Tuple[int, int]] = []  # (pc, target node id)
+        self.loop_slots: Dict[int, int] = {}  # loop condition node id -> iterator slot
+        self.resolver = Resolver()
+        self.cse_counts: Dict[Any, int] = {}  # subtree key -> occurrences in current expression
+        self.cse_slots: Dict[Any, int] = {}  # subtree key -> scratch slot holding its value
+        self.cse_conditional = 0  # > 0 while emitting code that may be skipped
+
+    def compile(self, graph: LogicGraph) -> CodeObject:
+        """Compile a graph into a flat instruction stream"""
+        if graph.entry_node_id is None:
+            raise RuntimeError("Graph has no entry node")
+
+        self.graph = graph
+        self.resolver.resolve(graph)
+        self.edge_types = {(src, dst): edge_type for src, dst, edge_type in graph.edges}
+
+        # Each loop keeps its iterator in an anonymous frame slot
+        for node in graph.nodes.values():
+            if node.type in ('for_setup', 'repeat_setup'):
+                cond_id = self._next(node)
+                self.loop_slots[cond_id] = self.resolver.slot(f'.iter{cond_id}')
+
+        worklist = [graph.entry_node_id]
+        while worklist:
+            node_id = worklist.pop()
+            while node_id is not None and node_id not in self.node_offsets:
+                node = graph.nodes.get(node_id)
+                if node is None:
+                    node_id = None
+                    break
+                self.node_offsets[node_id] = len(self.instructions)
+                node_id = self._compile_node(node, worklist)
+                if node_id in self.node_offsets:
+                    # Already laid out, so this jumps backwards; the mutable arg
+                    # counts hits for the trace JIT
+                    self._emit(OP_JUMP_BACKWARD, [self.node_offsets[node_id], 0])
+            if node_id is None and (not self.instructions or self.instructions[-1][0] != OP_RETURN):
+                self._emit(OP_LOAD_CONST, None)
+                self._emit(OP_RETURN)
+
+        for pc, target in self.pending_jumps:
+            instruction = self.instructions[pc]
+            if instruction[0] == OP_FOR_ITER:
+                slot, _, var_slot = instruction[1]
+                instruction[1] = (slot, self.node_offsets[target], var_slot)
+            else:
+                instruction[1] = self.node_offsets[target]
+
+        instructions = [(op, arg) for op, arg in self.instructions]
+        return CodeObject(instructions, dict(self.node_offsets), self.resolver.varnames)
+
+    # ------------------------------------------------------------------
+    # Emission helpers
+
+    def _emit(self, op: int, arg: Any = None) -> int:
+        self.instructions.append([op, arg])
+        return len(self.instructions) - 1
+
+    def _emit_jump(self, op: int, target_node_id: int):
+        pc = self._emit(op, None)
+        self.pending_jumps.append((pc, target_node_id))
+
+    def _successor_by_edge(self, node: GraphNode, edge_type: str) -> Optional[int]:
+        for succ_id in node.successors:
+            if self.edge_types.get((node.id, succ_id)) == edge_type:
+                return succ_id
+        return None
+
+    def _successor_not_edge(self, node: GraphNode, edge_type: str) -> Optional[int]:
+        for succ_id in node.successors:
+            if self.edge_types.get((node.id, succ_id)) != edge_type:
+                return succ_id
+        return None
+
+    @staticmethod
+    def _next(node: GraphNode) -> Optional[int]:
+        return node.next_id
+
+    # ------------------------------------------------------------------
+    # Nodes
+
+    def _compile_node(self, node: GraphNode, worklist: List[int]) -> Optional[int]:
+        """Emit code for a node and return the node that should follow it"""
+        data = node.data
+        node_type = node.type
+
+        if node_type == 'exit':
+            self._emit(OP_LOAD_CONST, None)
+            self._emit(OP_RETURN)
+            return None
+
+        if node_type == 'loop_exit':
+            return self._next(node)
+
+        if node_type == 'assignment':
+            self._compile_expression(data['value'])
+            self._emit(OP_STORE_FAST, self.resolver.slot(data['variable']))
+            return self._next(node)
+
+        if node_type == 'output':
+            # Adjacent string constants are joined; text after the last value
+            # (and the newline) is written with it as OP_PRINT's end
+            values = []
+            text = ''
+            for expr in data['expressions']:
+                value = self.fold(expr)
+                if type(value) is Const and type(value.value) is str:
+                    text += value.value
+                    continue
+                if text:
+                    values.append(Const(text))
+                    text = ''
+                values.append(value)
+            if data.get('newline', True):
+                text += '\n'
+            for value in values:
+                self._compile_folded(value)
+            self._emit(OP_PRINT, (len(values), text))
+            return self._next(node)
+
+        if node_type == 'input':
+            self._emit(OP_INPUT, (data['prompt'], data.get('input_type', 'string')))
+            self._emit(OP_STORE_FAST, self.resolver.slot(data['variable']))
+            return self._next(node)
+
+        if node_type == 'if':
+            then_id = self._successor_by_edge(node, 'then')
+            else_id = self._successor_by_edge(node, 'else')
+            if else_id is None:
+                else_id = self._successor_by_edge(node, 'else_skip')
+            if then_id is None:
+                then_id = self._next(node)
+            if else_id is None:
+                else_id = self._next(node)
+            self._compile_expression(data['condition'])
+            return self._branch(then_id, else_id, worklist)
+
+        if node_type == 'while':
+            exit_id = self._successor_by_edge(node, 'exit')
+            body_id = self._successor_not_edge(node, 'exit')
+            self._compile_expression(data['condition'])
+            return self._branch(body_id, exit_id, worklist)
+
+        if node_type == 'for_setup':
+            self._compile_expression(data['iterable'])
+            self._emit(OP_GET_ITER, self.loop_slots[self._next(node)])
+            return self._next(node)
+
+        if node_type == 'repeat_setup':
+            self._compile_expression(data['count'])
+            self._emit(OP_GET_REPEAT_ITER, self.loop_slots[self._next(node)])
+            return self._next(node)
+
+        if node_type in ('for_condition', 'repeat_condition'):
+            exit_id = self._successor_by_edge(node, 'exit')
+            body_id = self._successor_not_edge(node, 'exit')
+            slot = self.loop_slots[node.id]
+            # FOR_ITER stores each item straight into the loop variable (repeat
+            # loops have none)
+            var_slot = self.resolver.slot(data['iterator']) if node_type == 'for_condition' else None
+            if exit_id is None:
+                self._emit(OP_FOR_ITER, (slot, -1, var_slot))  # exhausted iterator ends the program
+            else:
+                pc = self._emit(OP_FOR_ITER, (slot, None, var_slot))
+                self.pending_jumps.append((pc, exit_id))
+                worklist.append(exit_id)
+            return body_id
+
+        if node_type == 'function_def':
+            # Registered before the program runs (Resolver.function_definitions)
+            return self._next(node)
+
+        if node_type == 'function_call':
+            args = data['arguments']
+            for arg in args:
+                self._compile_expression(arg)
+            self._emit_call(data['function'], len(args))
+            self._emit(OP_POP_TOP)
+            return self._next(node)
+
+        if node_type == 'return':
+            value_expr = data.get('value')
+            if value_expr:
+                self._compile_expression(value_expr)
+            else:
+                self._emit(OP_LOAD_CONST, None)
+            self._emit(OP_RETURN)
+            return None
+
+        if node_type in ('break', 'continue'):
+            # next_id already points at the break_to/continue_to target
+            return self._next(node)
+
+        if node_type == 'file_read':
+            self._compile_expression(data['filepath'])
+            self._emit(OP_READ_FILE, (data['variable'], data.get('mode', 'text')))
+            return self._next(node)
+
+        if node_type == 'file_write':
+            self._compile_expression(data['filepath'])
+            self._compile_expression(data['content'])
+            self._emit(OP_WRITE_FILE, data.get('mode', 'text'))
+            return self._next(node)
+
+        if node_type == 'list_append':
+            list_expr = data['list']
+            if list_expr['type'] == 'variable':
+                slot = self.resolver.slot(list_expr['name'])
+                self._emit(OP_LOAD_FAST, slot)
+                self._compile_expression(data['value'])
+                self._emit(OP_LIST_APPEND, slot)
+            return self._next(node)
+
+        # entry, merge, then_entry, else_entry and unknown nodes just fall through
+        return self._next(node)
+
+    def _branch(self, taken_id: Optional[int], not_taken_id: Optional[int],
+                worklist: List[int]) -> Optional[int]:
+        """Pop a condition and continue at taken_id when it is truthy"""
+        if not_taken_id is None:
+            self._emit(OP_POP_TOP)
+            return taken_id
+        self._emit_jump(OP_JMP_IF_FALSE, not_taken_id)
+        worklist.append(not_taken_id)
+        return taken_id
+
+    # ------------------------------------------------------------------
+    # Expressions
+
+    def _compile_expression(self, expr: Optional[Dict]):
+        """Fold, share and flatten an expression dictionary"""
+        self._compile_folded(self.fold(expr))
+
+    def _compile_folded(self, expr: 'Expr'):
+        """Share and flatten an already folded expression"""
+        self.cse_counts = {}
+        self.cse_slots = {}
+        if not expr.has_call:
+            self._count_subexpressions(expr)
+        self._emit_expression(expr)
+
+    # ------------------------------------------------------------------
+    # Constant folding
+
+    def fold(self, expr: Optional[Dict]) -> 'Expr':
+        """Lower an expression dictionary to Expr nodes, folding literal-only subtrees"""
+        if not isinstance(expr, dict):
+            return Const(None)
+
+        expr_type = expr.get('type')
+
+        if expr_type == 'literal':
+            return Const(expr['value'])
+
+        if expr_type == 'variable':
+            return Load(expr['name'])
+
+        if expr_type in ('binary_op', 'comparison'):
+            left = self.fold(expr['left'])
+            right = self.fold(expr['right'])
+            symbol = expr['operator']
+            func = FOLD_OPERATORS.get(symbol)
+            if func is not None and type(left) is Const and type(right) is Const:
+                folded = self._try_fold(func, left.value, right.value)
+                if folded is not None:
+                    return folded
+            table = BINARY_OPCODES if expr_type == 'binary_op' else COMPARISON_OPCODES
+            return BinOp(table.get(symbol), symbol, left, right)
+
+        if expr_type == 'logical_op':
+            operator = expr['operator']
+            operands = [self.fold(o) for o in expr['operands']]
+            if self.is_truthy is not None and operator in ('and', 'or'):
+                # Constants that cannot decide the result are dropped; operands
+                # after one that does would never run, so they are dropped too
+                deciding = operator == 'or'
+                kept = []
+                for operand in operands:
+                    if type(operand) is not Const:
+                        kept.append(operand)
+                    elif self.is_truthy(operand.value) == deciding:
+                        if not kept:
+                            return Const(deciding)
+                        kept.append(operand)
+                        break
+                if not kept:
+                    return Const(not deciding)
+                operands = kept
+            if self.is_truthy is not None and operands and all(type(o) is Const for o in operands):
+                truths = [self.is_truthy(o.value) for o in operands]
+                if operator == 'not':
+                    return Const(not truths[0])
+                if operator == 'and':
+                    return Const(all(truths))
+                if operator == 'or':
+                    return Const(any(truths))
+            return Logical(operator, operands)
+
+        if expr_type == 'list_literal':
+            return ListExpr([self.fold(e) for e in expr['elements']])
+
+        if expr_type == 'function_call':
+            args = [self.fold(a) for a in expr['arguments']]
+            name = (expr['function'] or '').strip().lower()
+            if name in PURE_BUILTINS and name in self.builtins:
+                values = [self._literal_value(a) for a in args]
+                if all(v is not _NOT_CONSTANT for v in values):
+                    folded = self._try_fold(self.builtins[name], values)
+                    if folded is not None:
+                        return folded
+            return Call(expr['function'], args)
+
+        return Const(None)
+
+    def _literal_value(self, expr: 'Expr') -> Any:
+        """Python value of a constant argument (a fresh list for list literals)"""
+        if type(expr) is Const:
+            return expr.value
+        if type(expr) is ListExpr:
+            values = [self._literal_value(e) for e in expr.elements]
+            if all(v is not _NOT_CONSTANT for v in values):
+                return values
+        return _NOT_CONSTANT
+
+    @staticmethod
+    def _try_fold(func: Callable, *args) -> Optional['Const']:
+        # Anything that fails is left for the VM so errors surface at run time
+        try:
+            value = func(*args)
+        except Exception:
+            return None
+        if type(value) not in FOLDABLE_TYPES:
+            return None
+        return Const(value)
+
+    # ------------------------------------------------------------------
+    # Common subexpression elimination
+
+    def _count_subexpressions(self, expr: 'Expr'):
+        """Count operator subtrees in evaluation order, not descending into repeats"""
+        key = expr.key
+        if key is not None and type(expr) in (BinOp, Logical):
+            seen = key in self.cse_counts
+            self.cse_counts[key] = self.cse_counts.get(key, 0) + 1
+            if seen:
+                return
+        children = expr.children()
+        if type(expr) is Logical and expr.operator in ('and', 'or'):
+            # Later operands may be skipped, so they cannot define a shared value
+            children = children[:1]
+        for child in children:
+            self._count_subexpressions(child)
+
+    @staticmethod
+    def repeated_subexpressions(expr: 'Expr') -> set:
+        """Keys of operator subtrees occurring more than once in expr"""
+        counts: Dict[Any, int] = {}
+
+        def visit(node: 'Expr'):
+            key = node.key
+            if key is not None and type(node) in (BinOp, Logical):
+                counts[key] = counts.get(key, 0) + 1
+                if counts[key] > 1:
+                    return
+            for child in node.children():
+                visit(child)
+
+        visit(expr)
+        return {key for key, count in counts.items() if count > 1}
+
+    def _emit_expression(self, expr: 'Expr'):
+        """Flatten an expression tree into postfix instructions"""
+        kind = type(expr)
+
+        if kind is Const:
+            self._emit(OP_LOAD_CONST, expr.value)
+
+        elif kind is Load:
+            self._emit(OP_LOAD_FAST, self.resolver.slot(expr.name))
+
+        elif kind is BinOp:
+            if self._emit_shared(expr):
+                return
+            left, right = expr.left, expr.right
+            if expr.opcode is None:
+                self._emit_expression(left)
+                self._emit_expression(right)
+                self._emit(OP_POP_TOP)
+                self._emit(OP_POP_TOP)
+                self._emit(OP_LOAD_CONST, None)
+            elif type(left) is Load and type(right) is Const and type(right.value) in NUMERIC_TYPES:
+                # One instruction instead of LOAD_FAST, LOAD_CONST, <op>
+                symbol = expr.symbol
+                slot = self.resolver.slot(left.name)
+                self._emit(OP_BINARY_FAST_CONST, (slot, symbol, right.value, FOLD_OPERATORS[symbol]))
+            else:
+                self._emit_expression(left)
+                self._emit_expression(right)
+                self._emit(expr.opcode)
+
+        elif kind is Logical:
+            if self._emit_shared(expr):
+                return
+            operator = expr.operator
+            operands = expr.operands
+            if operator == 'not':
+                self._emit_expression(operands[0])
+                self._emit(OP_NOT)
+            elif operator in ('and', 'or'):
+                # The first deciding operand leaves False (and) / True (or) and
+                # jumps past the rest; if none decides, the opposite is pushed.
+                jump_op = OP_JMP_IF_FALSE_OR_POP if operator == 'and' else OP_JMP_IF_TRUE_OR_POP
+                exits = []
+                for index, operand in enumerate(operands):
+                    if index:
+                        self.cse_conditional += 1
+                    self._emit_expression(operand)
+                    exits.append(self._emit(jump_op, None))
+                self.cse_conditional -= len(operands) - 1
+                self._emit(OP_LOAD_CONST, operator == 'and')
+                for pc in exits:
+                    self.instructions[pc][1] = len(self.instructions)
+            else:
+                self._emit(OP_LOAD_CONST, None)
+
+        elif kind is ListExpr:
+            for element in expr.elements:
+                self._emit_expression(element)
+            self._emit(OP_BUILD_LIST, len(expr.elements))
+
+        elif kind is Call:
+            for arg in expr.args:
+                self._emit_expression(arg)
+            self._emit_call(expr.name, len(expr.args))
+
+    def _emit_call(self, name: str, nargs: int):
+        """Call a built-in directly (they take precedence over user functions) or by name"""
+        builtin = self.builtins.get((name or '').strip().lower())
+        if builtin is not None:
+            self._emit(OP_CALL_BUILTIN, (name, nargs, builtin))
+        else:
+            self._emit(OP_CALL_FUNCTION, (name, nargs))
+
+    def _emit_shared(self, expr: 'Expr') -> bool:
+        """Emit a repeated subtree once into a scratch slot; reload it afterwards"""
+        key = expr.key
+        if key is None or self.cse_counts.get(key, 0) < 2:
+            return False
+
+        slot = self.cse_slots.get(key)
+        if slot is not None:
+            self._emit(OP_LOAD_FAST, slot)
+            return True
+        if self.cse_conditional:
+            return False
+
+        count = self.cse_counts.pop(key)
+        self._emit_expression(expr)
+        self.cse_counts[key] = count
+        slot = self.resolver.slot(f'.t{len(self.cse_slots)}')
+        self.cse_slots[key] = slot
+        self._emit(OP_DUP_TOP)
+        self._emit(OP_STORE_FAST, slot)
+        return True
+
+
+    # ------------------------------------------------------------------
+    # Python code generation
+
+    def emit_python(self, graph: LogicGraph) -> Optional[str]:
+        """Lower a graph to the source of one function, program(_vm, _frame)
+
+        Variables become Python locals and if/while/for/repeat become Python
+        control flow, so nothing is dispatched at run time. Globals the source
+        needs are collected in self.python_globals. Returns None when the graph
+        has no such form (a variable name that cannot be a Python local, or
+        control flow that is not nested loops and ifs); the VM runs those.
+        """
+        if graph.entry_node_id is None:
+            raise RuntimeError("Graph has no entry node")
+
+        self.graph = graph
+        self.resolver.resolve(graph)
+        self.edge_types = {(src, dst): edge_type for src, dst, edge_type in graph.edges}
+        if not all(is_python_name(name) for name in self.resolver.varnames):
+            return None
+
+        # Calls only need to publish the locals if some function body reads a
+        # name besides its parameters (it could be a global)
+        self.export_locals = any(
+            not Resolver.names_read(node.data['body']) <= set(node.data['parameters'])
+            for node in graph.nodes.values() if node.type == 'function_def'
+        )
+        # Loop passes are counted in a local unless functions can run loops
+        # too; then every pass goes to the VM's count, which calls share
+        self.shared_steps = any(node.type == 'function_def' for node in graph.nodes.values())
+        self.python_globals: Dict[str, Any] = dict(PYTHON_HELPERS)
+        self.lines: List[str] = []
+        self.loop_heads: List[int] = []
+        try:
+            self._emit_block(graph.entry_node_id, 2)
+        except _Unstructured:
+            return None
+
+        # Never runs, but makes every variable a local so reading one that was
+        # never assigned raises UnboundLocalError rather than looking up a global
+        declare = ' = '.join(self.resolver.varnames + ['None'])
+        return '\n'.join([
+            'def program(_vm, _frame):',
+            f'    if False: {declare}',
+            '    _truthy = _vm._is_truthy',
+            '    _write = _vm._write',
+            '    _limit = _vm.max_iterations',
+            '    _steps = _vm.iteration_count',
+            '    try:',
+            *self.lines,
+            '        return None',
+            '    finally:',
+            '        _vm._store_python_locals(_locals())',
+        ]) + '\n'
+
+    def emit_repeat_kernel(self, statements: List[Dict], iterator: Optional[str] = None,
+                           unroll: Optional[int] = None) -> Optional[Tuple[str, List[str], List[str]]]:
+        """Lower a serialized repeat body to kernel(_count, _out, <names>)
+
+        Only bodies made of assignments whose expressions call nothing but
+        built-ins qualify. The kernel receives every variable the body uses,
+        runs the body _count times with them as Python locals, and leaves the
+        assigned ones in _out (even if the body raises). With an iterator
+        name it lowers a for_each body instead: the first parameter is the
+        sequence to loop over and the iterator is one of the assigned names.
+        With unroll, a repeat body is written out that many times instead of
+        looping (the caller passes the same count). Returns (source, names,
+        assigned names) or None.
+        """
+        self.python_globals = dict(PYTHON_HELPERS)
+        self.export_locals = False
+        names: Dict[str, None] = {}
+        assigned: Dict[str, None] = {} if iterator is None else {iterator: None}
+        lines = []
+        for stmt in statements or ():
+            if not isinstance(stmt, dict) or stmt.get('type') != 'assignment':
+                return None
+            value = self.fold(stmt.get('value'))
+            if not self._calls_only_builtins(value):
+                return None
+            names.update(dict.fromkeys(Resolver.names_read(stmt.get('value'))))
+            names[stmt['variable']] = assigned[stmt['variable']] = None
+            lines.append(f"{stmt['variable']} = {self._python_expression(value)}")
+        names.pop(iterator, None)
+        if not lines or not all(is_python_name(name) for name in [*names, *assigned]):
+            return None
+
+        if iterator is not None:
+            body = [f'        for {iterator} in _count:', *[' ' * 12 + line for line in lines]]
+        elif unroll is not None:
+            body = [' ' * 8 + line for line in lines * unroll] or ['        pass']
+        else:
+            body = ['        for _ in _range(_count):', *[' ' * 12 + line for line in lines]]
+        return '\n'.join([
+            f"def kernel(_count, _out, {', '.join(names)}):",
+            '    try:',
+            *body,
+            '    finally:',
+            f"        _out.extend(({', '.join(assigned)},))",
+        ]) + '\n', list(names), list(assigned)
+
+    def _calls_only_builtins(self, expr: 'Expr') -> bool:
+        if type(expr) is Call and self.builtins.get((expr.name or '').strip().lower()) is None:
+            return False
+        return all(self._calls_only_builtins(child) for child in expr.children())
+
+    def _line(self, depth: int, text: str):
+        self.lines.append('    ' * depth + text)
+
+    def _emit_block(self, node_id: Optional[int], depth: int) -> Optional[int]:
+        """Emit statements from node_id on
+
+        Stops at the enclosing loop's condition, at a statement that leaves the
+        block (return, break, continue) or at the merge node of the enclosing if,
+        whose id is returned.
+        """
+        start = len(self.lines)
+        while node_id is not None:
+            if node_id in self.loop_heads:
+                if node_id != self.loop_heads[-1]:
+                    raise _Unstructured(node_id)
+                self._emit_loop_step(depth)
+                break
+
+            node = self.graph.nodes.get(node_id)
+            if node is None:
+                break
+            node_type = node.type
+            data = node.data
+
+            if node_type == 'merge':
+                if len(self.lines) == start:
+                    self._line(depth, 'pass')
+                return node_id
+
+            if node_type == 'exit':
+                self._line(depth, 'return None')
+                return None
+
+            if node_type == 'return':
+                value_expr = data.get('value')
+                value = self._python_expression(self.fold(value_expr)) if value_expr else 'None'
+                self._line(depth, f'return {value}')
+                return None
+
+            if node_type == 'break':
+                if self._successor_by_edge(node, 'break_to') is not None:
+                    self._line(depth, 'break')
+                    return None
+            elif node_type == 'continue':
+                if self._successor_by_edge(node, 'continue_to') is not None:
+                    self._emit_loop_step(depth)
+                    self._line(depth, 'continue')
+                    return None
+            elif node_type == 'if':
+                node_id = self._emit_if(node, depth)
+                continue
+            elif node_type == 'while':
+                node_id = self._emit_while(node, depth)
+                continue
+            elif node_type in ('for_setup', 'repeat_setup'):
+                node_id = self._emit_for(node, depth)
+                continue
+            elif node_type in ('for_condition', 'repeat_condition'):
+                raise _Unstructured(node_id)  # loop entered without its setup
+            else:
+                self._emit_python_statement(node_type, data, depth)
+
+            node_id = self._next(node)
+
+        if len(self.lines) == start:
+            self._line(depth, 'pass')
+        return None
+
+    def _emit_loop_step(self, depth: int):
+        """Count a loop iteration, like the VM's backward jumps
+
+        When the program defines functions the count is kept on the VM, where
+        the calls' loop passes are counted too, so both add up to one limit.
+        """
+        if self.shared_steps:
+            self._line(depth, '_vm.iteration_count = _steps = _vm.iteration_count + 1')
+        else:
+            self._line(depth, '_steps += 1')
+        self._line(depth, 'if _steps > _limit: _vm._iterations_exceeded()')
+
+    def _emit_if(self, node: GraphNode, depth: int) -> Optional[int]:
+        """Emit an if statement; returns the node after its merge (None if nothing follows)"""
+        then_id = self._successor_by_edge(node, 'then')
+        else_id = self._successor_by_edge(node, 'else')
+        if else_id is None:
+            else_id = self._successor_by_edge(node, 'else_skip')
+        if then_id is None:
+            then_id = self._next(node)
+        if else_id is None:
+            else_id = self._next(node)
+
+        self._line(depth, f"if {self._python_condition(self.fold(node.data['condition']))}:")
+        merges = {self._emit_block(then_id, depth + 1)}
+        else_node = self.graph.nodes.get(else_id)
+        if else_node is not None and else_node.type == 'merge':
+            merges.add(else_id)
+        else:
+            self._line(depth, 'else:')
+            merges.add(self._emit_block(else_id, depth + 1))
+
+        merges.discard(None)
+        if len(merges) > 1:
+            raise _Unstructured(node.id)
+        if not merges:
+            return None  # both branches leave the block
+        return self._next(self.graph.nodes[merges.pop()])
+
+    def _emit_while(self, node: GraphNode, depth: int) -> Optional[int]:
+        exit_id = self._successor_by_edge(node, 'exit')
+        body_id = self._successor_not_edge(node, 'exit')
+        if exit_id is None:
+            raise _Unstructured(node.id)
+        self._line(depth, f"while {self._python_condition(self.fold(node.data['condition']))}:")
+        self._emit_loop_body(node.id, body_id, depth + 1)
+        return exit_id
+
+    def _emit_for(self, node: GraphNode, depth: int) -> Optional[int]:
+        cond = self.graph.nodes.get(self._next(node))
+        if cond is None or cond.type not in ('for_condition', 'repeat_condition'):
+            raise _Unstructured(node.id)
+        exit_id = self._successor_by_edge(cond, 'exit')
+        body_id = self._successor_not_edge(cond, 'exit')
+        if exit_id is None:
+            raise _Unstructured(cond.id)
+
+        if node.type == 'for_setup':
+            iterable = self._python_expression(self.fold(node.data['iterable']))
+            self._line(depth, f"for {cond.data['iterator']} in {iterable}:")
+        else:
+            count = self._python_expression(self.fold(node.data['count']))
+            self._line(depth, f"for _ in _repeat({count}):")
+        self._emit_loop_body(cond.id, body_id, depth + 1)
+        return exit_id
+
+    def _emit_loop_body(self, head_id: int, body_id: Optional[int], depth: int):
+        self.loop_heads.append(head_id)
+        if self._emit_block(body_id, depth) is not None:
+            raise _Unstructured(head_id)  # a merge that belongs outside the loop
+        self.loop_heads.pop()
+
+    def _emit_python_statement(self, node_type: str, data: Dict, depth: int):
+        """Emit a node that does not affect control flow"""
+        if node_type == 'assignment':
+            value = self._python_expression(self.fold(data['value']))
+            self._line(depth, f"{data['variable']} = {value}")
+
+        elif node_type == 'output':
+            parts = []
+            text = ''  # adjacent string constants are joined here
+            for expr in data['expressions']:
+                value = self.fold(expr)
+                if type(value) is Const and type(value.value) is str:
+                    text += value.value
+                    continue
+                if text:
+                    parts.append(repr(text))
+                    text = ''
+                parts.append(f'_text({self._python_expression(value)})')
+            if data.get('newline', True):
+                text += '\n'
+            if text or not parts:
+                parts.append(repr(text))
+            self._line(depth, f"_write({' + '.join(parts)})")
+
+        elif node_type == 'input':
+            prompt, input_type = data['prompt'], data.get('input_type', 'string')
+            self._line(depth, f"{data['variable']} = _vm._read_input({prompt!r}, {input_type!r})")
+
+        elif node_type == 'function_def':
+            pass  # registered before the program runs
+
+        elif node_type == 'function_call':
+            call = Call(data['function'], [self.fold(arg) for arg in data['arguments']])
+            self._line(depth, self._python_expression(call))
+
+        elif node_type == 'file_read':
+            # The interpreter stores the contents in the frame, and leaves the
+            # slot alone if the file cannot be read
+            name = data['variable']
+            slot = self.resolver.slot(name)
+            path = self._python_expression(self.fold(data['filepath']))
+            self._line(depth, f'_frame[{slot}] = _UNBOUND')
+            self._line(depth, f"_vm._read_file_into({path}, {name!r}, {data.get('mode', 'text')!r})")
+            self._line(depth, f'if _frame[{slot}] is not _UNBOUND: {name} = _frame[{slot}]')
+
+        elif node_type == 'file_write':
+            path = self._python_expression(self.fold(data['filepath']))
+            content = self._python_expression(self.fold(data['content']))
+            self._line(depth, f"_vm._write_file({path}, {content}, {data.get('mode', 'text')!r})")
+
+        elif node_type == 'list_append':
+            list_expr = data['list']
+            if list_expr['type'] == 'variable':
+                name = list_expr['name']
+                value = self._python_expression(self.fold(data['value']))
+                self._line(depth, f'{name} = _append_to({name}, {value})')
+
+        # entry, then_entry, else_entry, loop_exit and unknown nodes emit nothing
+
+    def _python_constant(self, value: Any) -> str:
+        """Source for a constant: a literal, or a global holding the value"""
+        if type(value) in (bool, int, str) or value is None or (type(value) is float and math.isfinite(value)):
+            text = repr(value)
+            return f'({text})' if text.startswith('-') else text
+        name = f'_k{len(self.python_globals)}'
+        self.python_globals[name] = value
+        return name
+
+    def _python_condition(self, expr: 'Expr') -> str:
+        """Source testing expr with Vyra's truthiness rules"""
+        source = self._python_expression(expr)
+        return source if self._is_bool(expr) else f'_truthy({source})'
+
+    @staticmethod
+    def _is_bool(expr: 'Expr') -> bool:
+        if type(expr) is BinOp:
+            return expr.opcode in COMPARISON_OPCODES.values()
+        if type(expr) is Logical:
+            return expr.operator in ('and', 'or', 'not')
+        return type(expr) is Const and type(expr.value) is bool
+
+    def _python_expression(self, expr: 'Expr') -> str:
+        """Python source equivalent to the VM code for expr"""
+        kind = type(expr)
+
+        if kind is Const:
+            return self._python_constant(expr.value)
+
+        if kind is Load:
+            return expr.name
+
+        if kind is BinOp:
+            left = self._python_expression(expr.left)
+            right = self._python_expression(expr.right)
+            if expr.opcode is None:
+                return f'_discard({left}, {right})'
+            if expr.symbol == '/':
+                return f'_div({left}, {right})'
+            if expr.symbol == '%':
+                return f'_mod({left}, {right})'
+            return f'({left} {expr.symbol} {right})'
+
+        if kind is Logical:
+            operator = expr.operator
+            if operator == 'not':
+                return f'(not {self._python_condition(expr.operands[0])})'
+            if operator in ('and', 'or'):
+                if not expr.operands:
+                    return repr(operator == 'and')
+                return '(' + f' {operator} '.join(self._python_condition(o) for o in expr.operands) + ')'
+            return 'None'
+
+        if kind is ListExpr:
+            return '[' + ', '.join(self._python_expression(e) for e in expr.elements) + ']'
+
+        if kind is Call:
+            args = '[' + ', '.join(self._python_expression(a) for a in expr.args) + ']'
+            builtin = self.builtins.get((expr.name or '').strip().lower())
+            if builtin is not None:
+                unary = getattr(builtin, 'unary', None)
+                if unary is not None and len(expr.args) == 1:
+                    # e.g. math.sqrt(x) rather than the wrapper with a list
+                    return f'{self._python_constant(unary)}({self._python_expression(expr.args[0])})'
+                return f'{self._python_constant(builtin)}({args})'
+            if self.export_locals:
+                return f'_vm._call_with_locals({expr.name!r}, {args}, _locals())'
+            return f'_vm._call_function({expr.name!r}, {args})'
+
+        return 'None'
+
+
+# ----------------------------------------------------------------------
+# Expression tree used by the compiler
+#
+# Each node carries a structural `key` (None when the subtree must not be
+# shared: lists are mutable and calls may have side effects) and a
+# `has_call` flag, both computed bottom-up on construction.
+
+class Expr:
+    __slots__ = ('key', 'has_call')
+
+    def children(self) -> List['Expr']:
+        return []
+
+
+class Const(Expr):
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.key = ('const', type(value).__name__, value) if type(value) in FOLDABLE_TYPES else None
+        self.has_call = False
+
+
+class Load(Expr):
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+        self.key = ('load', name)
+        self.has_call = False
+
+
+class BinOp(Expr):
+    """Arithmetic or comparison; opcode is None for unknown operators"""
+    __slots__ = ('opcode', 'symbol', 'left', 'right')
+
+    def __init__(self, opcode: Optional[int], symbol: str, left: Expr, right: Expr):
+        self.opcode = opcode
+        self.symbol = symbol
+        self.left = left
+        self.right = right
+        keyed = left.key is not None and right.key is not None
+        self.key = (symbol, left.key, right.key) if keyed else None
+        self.has_call = left.has_call or right.has_call
+
+    def children(self) -> List[Expr]:
+        return [self.left, self.right]
+
+
+class Logical(Expr):
+    __slots__ = ('operator', 'operands')
+
+    def __init__(self, operator: str, operands: List[Expr]):
+        self.operator = operator
+        self.operands = operands
+        child_keys = tuple(o.key for o in operands)
+        self.key = (operator, child_keys) if None not in child_keys else None
+        self.has_call = any(o.has_call for o in operands)
+
+    def children(self) -> List[Expr]:
+        return self.operands
+
+
+class ListExpr(Expr):
+    __slots__ = ('elements',)
+
+    def __init__(self, elements: List[Expr]):
+        self.elements = elements
+        self.key = None
+        self.has_call = any(e.has_call for e in elements)
+
+    def children(self) -> List[Expr]:
+        return self.elements
+
+
+class Call(Expr):
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name: str, args: List[Expr]):
+        self.name = name
+        self.args = args
+        self.key = None
+        self.has_call = True
+
+    def children(self) -> List[Expr]:
+        return self.args
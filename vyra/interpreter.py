@@ -1,63 +1,338 @@
 """Vyra Interpreter - Executes logic graphs.
 
-Traverses the graph and executes operations with proper state management.
+Runs the graph as one generated Python function when it has a structured form,
+otherwise compiles it to bytecode for a dispatch loop; in debug mode the graph
+is traversed node by node instead so every step can be traced.
 """
 
 import sys
 import json
+import getpass
 import math
 import random
 import time
 import os
 import importlib
+import re
+import weakref
+from itertools import groupby
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from .logic_graph import LogicGraph, GraphNode
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from .logic_graph import NODE_KINDS, LogicGraph, GraphNode
+from .bytecode import (
+    BinOp, Call, CodeObject, Compiler, Const, Expr, FOLD_OPERATORS, ListExpr, Load, Logical,
+    NUM_OPCODES, Resolver, OP_ADD, OP_BINARY_FAST_CONST, OP_BUILD_LIST, OP_CALL_BUILTIN,
+    OP_CALL_FUNCTION, OP_DIV, OP_DUP_TOP, OP_ENTER_TRACE, OP_EQ, OP_FOR_ITER, OP_GE,
+    OP_GET_ITER, OP_GET_REPEAT_ITER, OP_GT, OP_INPUT, OP_JMP, OP_JMP_IF_FALSE,
+    OP_JMP_IF_FALSE_OR_POP, OP_JMP_IF_TRUE_OR_POP, OP_JUMP_BACKWARD, OP_LE, OP_LIST_APPEND,
+    OP_LOAD_CONST, OP_LOAD_FAST, OP_LT, OP_MOD, OP_MUL, OP_NE, OP_NOT, OP_POP_TOP, OP_POW,
+    OP_PRINT, OP_READ_FILE, OP_RETURN, OP_STORE_FAST, OP_SUB, OP_WRITE_FILE,
+)
+from .jit import DEOPT, HOT_LOOP_THRESHOLD, TraceCompiler
+
+
+# Marks a frame slot whose variable has not been assigned yet
+_UNBOUND = object()
+
+# Returned by _call_builtin when there is no built-in of that name (a built-in
+# may itself return None)
+_NO_BUILTIN = object()
+
+# Literal repeat counts up to this are unrolled in repeat kernels
+UNROLL_LIMIT = 8
+
+# Results of serialized break/continue statements (see _compile_body); loops
+# recognise them by identity
+_BREAK = ('break', None)
+_CONTINUE = ('continue', None)
+
+
+def _empty_body(ctx):
+    """Compiled form of a serialized body with nothing to run"""
+    return None
+
+
+# Characters ignored when deciding whether an input answer looks numeric
+_NUMBER_PUNCTUATION = str.maketrans('', '', '.-')
+
+# Strings that count as false in conditions (compared lowercased)
+_FALSY_STRINGS = frozenset(('false', 'no', '', '0'))
+
+
+# ----------------------------------------------------------------------
+# Built-in functions
+#
+# Each takes the evaluated argument list. Names are matched lowercased.
+
+def _py_call(args: List[Any]) -> Any:
+    """Python bridge (opt-in)
+
+    Usage from Vyra: Set x to call py_call with "math" and "sqrt" and 16.
+    """
+    enabled = os.getenv('VYRA_PY_BRIDGE', '0').strip().lower() in {'1', 'true', 'yes', 'on'}
+    if not enabled:
+        raise RuntimeError("Python bridge is disabled. Set VYRA_PY_BRIDGE=1 to enable.")
+
+    if len(args) < 2:
+        raise ValueError('py_call expects at least 2 arguments: module_name, function_path, [args...]')
+
+    module_name = str(args[0])
+    func_path = str(args[1])
+    call_args = args[2:]
+
+    allow_raw = os.getenv('VYRA_PY_ALLOW', '').strip()
+    allowed = {m.strip() for m in allow_raw.split(',') if m.strip()}
+    if module_name not in allowed:
+        raise RuntimeError(
+            f"Python module '{module_name}' is not allowed. "
+            "Set VYRA_PY_ALLOW to a comma-separated allowlist (e.g., VYRA_PY_ALLOW=math,json)."
+        )
+
+    mod = importlib.import_module(module_name)
+    target: Any = mod
+    for part in func_path.split('.'):
+        if not part:
+            continue
+        target = getattr(target, part)
+
+    if not callable(target):
+        raise TypeError(f"Python target '{module_name}.{func_path}' is not callable")
+
+    return target(*call_args)
+
+
+def _substring(args: List[Any]) -> str:
+    s = str(args[0]) if args else ""
+    start = int(args[1]) if len(args) > 1 else 0
+    end = int(args[2]) if len(args) > 2 else None
+    return s[start:end]
+
+
+def _split(args: List[Any]) -> List[str]:
+    s = str(args[0]) if args else ""
+    sep = str(args[1]) if len(args) > 1 else None
+    return s.split(sep)
+
+
+def _join(args: List[Any]) -> str:
+    sep = str(args[0]) if args else ""
+    items = args[1] if len(args) > 1 else []
+    return sep.join([str(x) for x in items])
+
+
+def _replace(args: List[Any]) -> str:
+    s = str(args[0]) if args else ""
+    old = str(args[1]) if len(args) > 1 else ""
+    new = str(args[2]) if len(args) > 2 else ""
+    return s.replace(old, new)
+
+
+def _append(args: List[Any]) -> Any:
+    lst = args[0] if args else []
+    val = args[1] if len(args) > 1 else None
+    if isinstance(lst, list):
+        lst.append(val)
+    return lst
+
+
+def _remove(args: List[Any]) -> Any:
+    lst = args[0] if args else []
+    val = args[1] if len(args) > 1 else None
+    if isinstance(lst, list) and val in lst:
+        lst.remove(val)
+    return lst
+
+
+def _sort(args: List[Any]) -> Any:
+    lst = args[0] if args else []
+    if isinstance(lst, list):
+        lst.sort()
+    return lst
+
+
+def _sleep(args: List[Any]) -> None:
+    seconds = float(args[0]) if args else 0.0
+    sys.stdout.flush()  # show what was displayed before pausing
+    time.sleep(max(0.0, seconds))
+    return None
+
+
+def _random_number(args: List[Any]) -> float:
+    if len(args) >= 2:
+        return random.uniform(float(args[0]), float(args[1]))
+    return random.random()
+
+
+def _random_choice(args: List[Any]) -> Any:
+    seq = args[0] if args else []
+    return random.choice(seq) if seq else None
+
+
+def _shuffle(args: List[Any]) -> Any:
+    seq = args[0] if args else []
+    if isinstance(seq, list):
+        random.shuffle(seq)
+    return seq
+
+
+def _unary(func: Callable[[Any], Any], default: Any) -> Callable[[List[Any]], Any]:
+    """Built-in applying func to its first argument, or default without arguments"""
+    builtin = lambda args: func(args[0]) if args else default
+    # Compiled code calls func directly when there is exactly one argument
+    builtin.unary = func
+    return builtin
+
+
+BUILTINS: Dict[str, Callable[[List[Any]], Any]] = {
+    'py_call': _py_call,
+    'python_call': _py_call,
+
+    # Type / basics
+    'len': _unary(len, 0),
+    'length': _unary(len, 0),
+    'str': _unary(str, ""),
+    'to_string': _unary(str, ""),
+    'string': _unary(str, ""),
+    'int': _unary(int, 0),
+    'to_int': _unary(int, 0),
+    'float': _unary(float, 0.0),
+    'to_float': _unary(float, 0.0),
+    'type_of': lambda args: type(args[0]).__name__ if args else 'none',
+
+    # Math
+    'abs': _unary(abs, 0),
+    'round': _unary(round, 0),
+    'floor': _unary(math.floor, 0),
+    'ceil': _unary(math.ceil, 0),
+    'sqrt': _unary(math.sqrt, 0),
+    'sin': _unary(math.sin, 0),
+    'cos': _unary(math.cos, 0),
+    'tan': _unary(math.tan, 0),
+    'log': _unary(math.log, 0),
+    'exp': _unary(math.exp, 0),
+
+    # String
+    'uppercase': lambda args: str(args[0]).upper() if args else "",
+    'upper': lambda args: str(args[0]).upper() if args else "",
+    'lowercase': lambda args: str(args[0]).lower() if args else "",
+    'lower': lambda args: str(args[0]).lower() if args else "",
+    'substring': _substring,
+    'split': _split,
+    'join': _join,
+    'replace': _replace,
+
+    # List / collections
+    'append': _append,
+    'remove': _remove,
+    'sort': _sort,
+
+    # Time
+    'current_time': lambda args: datetime.now().isoformat(),
+    'timestamp': lambda args: time.time(),
+    'sleep': _sleep,
+
+    # Random
+    'random_number': _random_number,
+    'random_choice': _random_choice,
+    'shuffle': _shuffle,
+}
 
 
 class ExecutionContext:
-    """Manages variable scopes and execution state"""
+    """Manages variable frames and execution state
+    
+    Each frame is a list of slot values with a name -> slot index alongside it.
+    Compiled code addresses slots directly; name lookups check the current frame
+    and then the global frame.
+    """
     
-    def __init__(self):
-        self.scopes = [{}]  # Stack of scopes (global at bottom)
+    __slots__ = ('frames', 'frame_slots', 'locals', 'local_slots', 'globals', 'global_slots',
+                 'functions', 'return_value', 'should_return', 'should_break', 'should_continue')
+    
+    def __init__(self, varnames: Sequence[str] = ()):
+        self.frames: List[list] = []  # Stack of frames (global at bottom)
+        self.frame_slots: List[Dict[str, int]] = []
         self.functions = {}  # Function definitions
         self.return_value = None
         self.should_return = False
         self.should_break = False
         self.should_continue = False
+        self.push_scope(varnames)
+        self.globals = self.locals
+        self.global_slots = self.local_slots
     
-    def push_scope(self):
-        """Enter a new scope (function call, block)"""
-        self.scopes.append({})
+    def push_scope(self, varnames: Sequence[str] = (), slots: Optional[Dict[str, int]] = None):
+        """Enter a new frame with preallocated slots for varnames
+        
+        slots is the name -> index map for varnames if the caller has one
+        precomputed; the frame gets its own copy, since set_variable can grow it.
+        """
+        self.locals = [_UNBOUND] * len(varnames)
+        if slots is None:
+            self.local_slots = {name: slot for slot, name in enumerate(varnames)}
+        else:
+            self.local_slots = slots.copy()
+        self.frames.append(self.locals)
+        self.frame_slots.append(self.local_slots)
     
     def pop_scope(self):
-        """Exit current scope"""
-        if len(self.scopes) > 1:
-            self.scopes.pop()
+        """Exit current frame"""
+        if len(self.frames) > 1:
+            self.frames.pop()
+            self.frame_slots.pop()
+            self.locals = self.frames[-1]
+            self.local_slots = self.frame_slots[-1]
     
     def get_variable(self, name: str) -> Any:
-        """Get variable value from current or parent scopes"""
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
+        """Get variable value from the current frame, then globals"""
+        slot = self.local_slots.get(name)
+        if slot is not None:
+            value = self.locals[slot]
+            if value is not _UNBOUND:
+                return value
+        slot = self.global_slots.get(name)
+        if slot is not None:
+            value = self.globals[slot]
+            if value is not _UNBOUND:
+                return value
         raise NameError(f"Variable '{name}' is not defined")
     
     def set_variable(self, name: str, value: Any):
-        """Set variable in current scope"""
-        self.scopes[-1][name] = value
+        """Set variable in current frame, growing it for names without a slot"""
+        slot = self.local_slots.get(name)
+        if slot is None:
+            self.local_slots[name] = len(self.locals)
+            self.locals.append(value)
+        else:
+            self.locals[slot] = value
     
     def has_variable(self, name: str) -> bool:
-        """Check if variable exists in any scope"""
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return True
-        return False
-    
-    def define_function(self, name: str, params: List[str], body_data: Any):
-        """Register a function"""
+        """Check if variable exists in the current frame or globals"""
+        try:
+            self.get_variable(name)
+        except NameError:
+            return False
+        return True
+    
+    def variables(self) -> Dict[str, Any]:
+        """Snapshot of the assigned variables in the current frame"""
+        # Names starting with '.' are compiler scratch slots
+        return {
+            name: self.locals[slot]
+            for name, slot in self.local_slots.items()
+            if self.locals[slot] is not _UNBOUND and not name.startswith('.')
+        }
+    
+    def define_function(self, name: str, params: List[str], body_data: Any,
+                        varnames: Optional[Sequence[str]] = None):
+        """Register a function, precomputing its frame layout"""
+        if varnames is None:
+            varnames = params
         self.functions[name] = {
             'params': params,
-            'body': body_data
+            'body': body_data,
+            'varnames': varnames,
+            'slots': {var: slot for slot, var in enumerate(varnames)}
         }
     
     def get_function(self, name: str) -> Dict:
@@ -80,126 +355,259 @@ class VyraInterpreter:
         self.iteration_count = 0
         self.max_call_depth = 200
         self.call_depth = 0
+        self._loop_iterators: Dict[int, Any] = {}  # debug walker: loop condition node id -> iterator
+        self._node_handlers = self._build_node_handlers()
+        # The same handlers indexed by GraphNode.kind; unknown kinds go to _execute_node
+        self._kind_handlers = [self._node_handlers.get(node_type, self._execute_node)
+                               for node_type in NODE_KINDS] + [self._execute_node]
+        self._op_handlers = self._build_op_handlers()
+        self._expr_compiler = Compiler(BUILTINS, self._is_truthy)
+        self._expr_code: Dict[int, Any] = {}  # id(expression dict) -> (dict, closure)
+        self._body_cache: Dict[int, Any] = {}  # id(serialized statement list) -> (list, closure)
+        self._calls: Dict[str, Callable[[List[Any]], Any]] = {}  # function name -> invoker
+        self._write = sys.stdout.write
+        # Run programs as generated Python functions where possible
+        self.generate_python = True
+        # Compiled code per graph; entries go away with their graphs
+        self._code_cache = weakref.WeakKeyDictionary()
+        self._python_cache = weakref.WeakKeyDictionary()
+        self._function_cache = weakref.WeakKeyDictionary()
 
     
     def execute(self, graph: LogicGraph) -> Any:
         """Execute a logic graph"""
+        stdout = sys.stdout
+        # A terminal flushes on every newline; during a run, output is flushed
+        # when the buffer fills, before input or sleep, and at the end.
+        # Debug runs keep line-by-line output.
+        relax = not self.debug and getattr(stdout, 'line_buffering', False) and hasattr(stdout, 'reconfigure')
+        if relax:
+            stdout.reconfigure(line_buffering=False)
+        try:
+            return self._execute(graph)
+        finally:
+            if relax:
+                stdout.flush()
+                stdout.reconfigure(line_buffering=True)
+    
+    def _execute(self, graph: LogicGraph) -> Any:
+        """Run a graph with fresh run state"""
         self.context = ExecutionContext()
         self.iteration_count = 0
         self.call_depth = 0
+        self._loop_iterators = {}
+        self._expr_code = {}
+        self._body_cache = {}
+        self._calls.clear()
+        # Bound once per run (not in __init__) so redirected stdout is honoured
+        self._write = sys.stdout.write
         
         if graph.entry_node_id is None:
             raise RuntimeError("Graph has no entry node")
         
-        # Start execution from entry node
-        return self._execute_from_node(graph, graph.entry_node_id)
+        if self.debug:
+            # Walk the graph node by node so every step can be traced
+            self._define_functions(graph)
+            return self._execute_from_node(graph, graph.entry_node_id)
+        
+        if self.generate_python:
+            program = self._compile_python(graph)
+            if program is not None:
+                self.context = ExecutionContext(program.varnames)
+                self._define_functions(graph)
+                return self._run_python(program)
+        
+        code = self._compile(graph)
+        self.context = ExecutionContext(code.varnames)
+        self._define_functions(graph)
+        return self._run_code(code)
+    
+    def _define_functions(self, graph: LogicGraph):
+        """Register every function the graph defines before it runs
+        
+        Definitions are hoisted, so function_def nodes do nothing when reached.
+        """
+        shape = (len(graph.nodes), len(graph.edges))
+        cached = self._function_cache.get(graph)
+        if cached is None or cached[0] != shape:
+            cached = (shape, Resolver.function_definitions(graph))
+            self._function_cache[graph] = cached
+        
+        self._calls.clear()
+        for definition in cached[1]:
+            self.context.define_function(*definition)
+            if self.debug:
+                print(f"[DEBUG] Defined function {definition[0]} with params {definition[1]}")
+    
+    def _compile(self, graph: LogicGraph) -> CodeObject:
+        """Compile a graph, reusing the cached code if the graph is unchanged"""
+        shape = (len(graph.nodes), len(graph.edges))
+        cached = self._code_cache.get(graph)
+        if cached is not None and cached[0] == shape:
+            return cached[1]
+        
+        code = Compiler(BUILTINS, self._is_truthy).compile(graph)
+        self._code_cache[graph] = (shape, code)
+        return code
+    
+    def _compile_python(self, graph: LogicGraph) -> Optional[Callable]:
+        """Generated Python function for a graph (None if it has no Python form)"""
+        shape = (len(graph.nodes), len(graph.edges))
+        cached = self._python_cache.get(graph)
+        if cached is not None and cached[0] == shape:
+            return cached[1]
+        
+        compiler = Compiler(BUILTINS, self._is_truthy)
+        source = compiler.emit_python(graph)
+        program = None
+        if source is not None:
+            namespace = dict(compiler.python_globals, _UNBOUND=_UNBOUND)
+            exec(compile(source, '<vyra>', 'exec'), namespace)
+            program = namespace['program']
+            program.source = source
+            program.varnames = compiler.resolver.varnames
+        self._python_cache[graph] = (shape, program)
+        return program
+    
+    def _run_python(self, program: Callable) -> Any:
+        """Call a generated program on the global frame"""
+        try:
+            value = program(self, self.context.globals)
+        except UnboundLocalError as error:
+            # A variable read before it was assigned; report it like the VM.
+            # Errors raised further in (helpers, called Python) pass through.
+            traceback = error.__traceback__
+            while traceback.tb_next is not None:
+                traceback = traceback.tb_next
+            if traceback.tb_frame.f_code is not program.__code__:
+                raise
+            match = re.search(r"'(\w+)'", str(error))
+            name = match.group(1) if match else '?'
+            raise NameError(f"Variable '{name}' is not defined") from None
+        
+        self.context.return_value = value
+        self.context.should_return = True
+        return value
+    
+    def _store_python_locals(self, values: Dict[str, Any]):
+        """Copy a generated program's locals into the global frame"""
+        frame = self.context.globals
+        for name, slot in self.context.global_slots.items():
+            frame[slot] = values.get(name, _UNBOUND)
+    
+    def _call_with_locals(self, name: str, args: List[Any], values: Dict[str, Any]) -> Any:
+        """Call a function from generated Python; the body may read its globals"""
+        self._store_python_locals(values)
+        return self._call_function(name, args)
+    
+    def _iterations_exceeded(self):
+        raise RuntimeError(f"Exceeded maximum iterations ({self.max_iterations}). Possible infinite loop.")
+    
+    def _run_code(self, code: CodeObject) -> Any:
+        """Run compiled bytecode until a RETURN (or exhausted jump) sets pc to -1"""
+        instructions = self._instructions = code.instructions
+        handlers = self._op_handlers
+        frame = self.context.globals
+        stack: List[Any] = []
+        pc = 0
+        
+        while pc >= 0:
+            op, arg = instructions[pc]
+            pc = handlers[op](frame, stack, arg, pc + 1)
+        
+        return self.context.return_value
+    
+    def _slot_name(self, slot: int) -> str:
+        """Name of a global slot (for error messages)"""
+        for name, index in self.context.global_slots.items():
+            if index == slot:
+                return name
+        return f'<slot {slot}>'
     
     def _execute_from_node(self, graph: LogicGraph, node_id: int) -> Any:
         """Execute graph starting from given node"""
+        self._run_block(graph, node_id)
+        return self.context.return_value if self.context.should_return else None
+    
+    def _run_block(self, graph: LogicGraph, node_id: Optional[int],
+                   head_id: Optional[int] = None, exit_id: Optional[int] = None) -> Optional[int]:
+        """Run nodes from node_id until control reaches head_id or exit_id
+        
+        Loop handlers run their bodies through this, stopping when the body
+        jumps back to the loop condition or breaks out. Returns where it
+        stopped, or None when the program ended or returned.
+        """
+        nodes = graph.nodes
+        handlers = self._kind_handlers
+        context = self.context
+        debug = self.debug
         current_id = node_id
         
-        while current_id is not None:
-            self.iteration_count += 1
-            
-            # Safety check for infinite loops
-            if self.iteration_count > self.max_iterations:
-                raise RuntimeError(f"Exceeded maximum iterations ({self.max_iterations}). Possible infinite loop.")
-            
-            # Get current node
-            if current_id not in graph.nodes:
-                break
+        while current_id is not None and current_id != head_id and current_id != exit_id:
+            node = nodes.get(current_id)
+            if node is None:
+                return None
             
-            node = graph.nodes[current_id]
-            
-            if self.debug:
+            if debug:
                 print(f"[DEBUG] Executing node {node.id}: {node.type}")
             
-            # Execute node
-            next_id = self._execute_node(graph, node)
+            current_id = handlers[node.kind](graph, node)
             
-            # Handle control flow
-            if self.context.should_return:
-                return self.context.return_value
-            
-            current_id = next_id
+            if context.should_return:
+                return None
         
-        return None
+        return current_id
+    
+    def _count_iteration(self):
+        """Safety check for infinite loops, made once per loop iteration"""
+        self.iteration_count += 1
+        if self.iteration_count > self.max_iterations:
+            self._iterations_exceeded()
     
     def _execute_node(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute a single node and return next node ID"""
-        
-        if node.type == 'entry':
-            return self._get_next_node(graph, node)
-        
-        elif node.type == 'exit':
-            return None
-        
-        elif node.type == 'assignment':
-            return self._execute_assignment(graph, node)
-        
-        elif node.type == 'output':
-            return self._execute_output(graph, node)
-        
-        elif node.type == 'input':
-            return self._execute_input(graph, node)
-        
-        elif node.type == 'if':
-            return self._execute_if(graph, node)
-        
-        elif node.type == 'while':
-            return self._execute_while(graph, node)
-        
-        elif node.type == 'for_setup':
-            return self._execute_for_setup(graph, node)
-        
-        elif node.type == 'for_condition':
-            return self._execute_for_condition(graph, node)
-        
-        elif node.type == 'repeat_setup':
-            return self._execute_repeat_setup(graph, node)
-        
-        elif node.type == 'repeat_condition':
-            return self._execute_repeat_condition(graph, node)
-        
-        elif node.type == 'function_def':
-            return self._execute_function_def(graph, node)
-        
-        elif node.type == 'function_call':
-            return self._execute_function_call(graph, node)
-        
-        elif node.type == 'return':
-            return self._execute_return(graph, node)
-        
-        elif node.type == 'break':
-            return self._find_break_target(graph, node)
-        
-        elif node.type == 'continue':
-            return self._find_continue_target(graph, node)
-        
-        elif node.type == 'merge':
-            return self._get_next_node(graph, node)
-        
-        elif node.type == 'loop_exit':
-            return self._get_next_node(graph, node)
-        
-        elif node.type == 'file_read':
-            return self._execute_file_read(graph, node)
-        
-        elif node.type == 'file_write':
-            return self._execute_file_write(graph, node)
-        
-        elif node.type == 'list_append':
-            return self._execute_list_append(graph, node)
-        
-        else:
+        handler = self._node_handlers.get(node.type)
+        if handler is None:
             if self.debug:
                 print(f"[DEBUG] Unknown node type: {node.type}")
-            return self._get_next_node(graph, node)
+            return node.next_id
+        return handler(graph, node)
+    
+    def _build_node_handlers(self) -> Dict[str, Any]:
+        """Build the node type -> handler table used by _execute_node"""
+        return {
+            'entry': self._get_next_node,
+            'exit': self._execute_exit,
+            'assignment': self._execute_assignment,
+            'output': self._execute_output,
+            'input': self._execute_input,
+            'if': self._execute_if,
+            'while': self._execute_while,
+            'for_setup': self._execute_for_setup,
+            'for_condition': self._execute_for_condition,
+            'repeat_setup': self._execute_repeat_setup,
+            'repeat_condition': self._execute_repeat_condition,
+            'function_def': self._get_next_node,  # registered by _define_functions
+            'function_call': self._execute_function_call,
+            'return': self._execute_return,
+            'break': self._get_next_node,
+            'continue': self._get_next_node,
+            'then_entry': self._get_next_node,
+            'else_entry': self._get_next_node,
+            'merge': self._get_next_node,
+            'loop_exit': self._get_next_node,
+            'file_read': self._execute_file_read,
+            'file_write': self._execute_file_write,
+            'list_append': self._execute_list_append,
+        }
+    
+    def _execute_exit(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
+        """Program end"""
+        return None
     
     def _execute_assignment(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute variable assignment"""
-        var_name = node.data['variable']
-        value_expr = node.data['value']
+        var_name, value_expr = node.args
         
         value = self._evaluate_expression(value_expr)
         self.context.set_variable(var_name, value)
@@ -207,190 +615,113 @@ class VyraInterpreter:
         if self.debug:
             print(f"[DEBUG] Assigned {var_name} = {value}")
         
-        return self._get_next_node(graph, node)
+        return node.next_id
     
     def _execute_output(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute output/print"""
-        expressions = node.data['expressions']
-        outputs = []
-        
-        for expr in expressions:
-            value = self._evaluate_expression(expr)
-            outputs.append(str(value))
-        
-        output_text = ''.join(outputs)
-        
-        if node.data.get('newline', True):
-            print(output_text)
-        else:
-            print(output_text, end='')
+        expressions, newline = node.args
+        self._write_output(expressions, newline)
         
-        return self._get_next_node(graph, node)
+        return node.next_id
     
     def _execute_input(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute user input"""
-        prompt = node.data['prompt']
-        var_name = node.data['variable']
-        input_type = node.data.get('input_type', 'string')
-        
-        if input_type == 'password':
-            import getpass
-            value = getpass.getpass(prompt)
-        else:
-            value = input(prompt)
-        
-        # Try to convert to number if it looks like one
-        if input_type == 'number' or (value.replace('.', '').replace('-', '').isdigit()):
-            try:
-                value = float(value) if '.' in value else int(value)
-            except ValueError:
-                pass
+        prompt, var_name, input_type = node.args
         
+        value = self._read_input(prompt, input_type)
         self.context.set_variable(var_name, value)
         
         if self.debug:
             print(f"[DEBUG] Input stored in {var_name}: {value}")
         
-        return self._get_next_node(graph, node)
+        return node.next_id
     
     def _execute_if(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute if statement"""
-        condition_expr = node.data['condition']
+        condition_expr, = node.args
         condition_value = self._evaluate_expression(condition_expr)
         
         if self.debug:
             print(f"[DEBUG] If condition: {condition_value}")
         
-        truthy = self._is_truthy(condition_value)
-
-        # Follow explicit edge labels when present
-        if truthy:
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'then':
-                    return succ_id
-        else:
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'else':
-                    return succ_id
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'else_skip':
-                    return succ_id
-
-        return self._get_next_node(graph, node)
+        return node.then_next if self._is_truthy(condition_value) else node.else_next
     
     def _execute_while(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Execute while loop condition check"""
-        condition_expr = node.data['condition']
-        condition_value = self._evaluate_expression(condition_expr)
-        
-        if self.debug:
-            print(f"[DEBUG] While condition: {condition_value}")
-        
-        if self._is_truthy(condition_value):
-            # Enter loop body
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') != 'exit':
-                    return succ_id
-        else:
-            # Exit loop
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'exit':
-                    return succ_id
-        
-        return self._get_next_node(graph, node)
+        """Execute a while loop, running the body in a Python loop"""
+        condition_expr, = node.args
+        body_id, exit_id = node.then_next, node.else_next
+        # Looked up once; the loop calls the compiled condition directly
+        condition = self._expression_code(condition_expr) if condition_expr is not None else None
+        context = self.context
+        is_truthy, run_block, count_iteration = self._is_truthy, self._run_block, self._count_iteration
+        debug, head_id = self.debug, node.id
+        
+        while True:
+            condition_value = condition(context) if condition is not None else None
+            
+            if debug:
+                print(f"[DEBUG] While condition: {condition_value}")
+            
+            if not is_truthy(condition_value):
+                return exit_id
+            stop_id = run_block(graph, body_id, head_id, exit_id)
+            if stop_id != head_id:
+                return stop_id  # break, or the program ended
+            count_iteration()
     
     def _execute_for_setup(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Set up for-each loop"""
-        iterator_var = node.data['iterator']
-        iterable_expr = node.data['iterable']
+        iterator_var, iterable_expr = node.args
         
         iterable = self._evaluate_expression(iterable_expr)
         
-        # Store iterator info in context
-        self.context.set_variable(f'__iter_{iterator_var}', iter(iterable))
-        self.context.set_variable(f'__iter_{iterator_var}_var', iterator_var)
+        # The loop's condition node owns the iterator
+        cond_id = node.next_id
+        self._loop_iterators[cond_id] = iter(iterable)
         
-        return self._get_next_node(graph, node)
+        return cond_id
     
     def _execute_for_condition(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Check for-each loop condition"""
-        iterator_var = node.data['iterator']
-        iterator = self.context.get_variable(f'__iter_{iterator_var}')
-        
-        try:
-            next_value = next(iterator)
-            self.context.set_variable(iterator_var, next_value)
-            
-            # Enter loop body
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') != 'exit':
-                    return succ_id
-        except StopIteration:
-            # Exit loop
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'exit':
-                    return succ_id
-        
-        return self._get_next_node(graph, node)
+        """Execute a for-each loop, running the body in a Python loop"""
+        iterator_var, = node.args
+        return self._run_loop(graph, node, iterator_var)
     
     def _execute_repeat_setup(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Set up repeat N times loop"""
-        count_expr = node.data['count']
+        count_expr, = node.args
         count = self._evaluate_expression(count_expr)
         
-        # Store counter
-        self.context.set_variable('__repeat_counter', 0)
-        self.context.set_variable('__repeat_max', int(count))
+        # Like for-each, each repeat loop owns its own iterator
+        cond_id = node.next_id
+        self._loop_iterators[cond_id] = iter(range(int(count)))
         
-        return self._get_next_node(graph, node)
+        return cond_id
     
     def _execute_repeat_condition(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Check repeat loop condition"""
-        counter = self.context.get_variable('__repeat_counter')
-        max_count = self.context.get_variable('__repeat_max')
-        
-        if counter < max_count:
-            # Increment counter
-            self.context.set_variable('__repeat_counter', counter + 1)
-            
-            # Enter loop body
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') != 'exit':
-                    return succ_id
-        else:
-            # Exit loop
-            for succ_id in node.successors:
-                edge = graph.graph[node.id][succ_id]
-                if edge.get('type') == 'exit':
-                    return succ_id
-        
-        return self._get_next_node(graph, node)
+        """Execute a repeat loop, running the body in a Python loop"""
+        return self._run_loop(graph, node, None)
     
-    def _execute_function_def(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Register function definition"""
-        name = node.data['name']
-        params = node.data['parameters']
-        body = node.data['body']
-        
-        self.context.define_function(name, params, body)
-        
-        if self.debug:
-            print(f"[DEBUG] Defined function {name} with params {params}")
-        
-        return self._get_next_node(graph, node)
+    def _run_loop(self, graph: LogicGraph, node: GraphNode, iterator_var: Optional[str]) -> Optional[int]:
+        """Run a for-each/repeat body once per item of the loop's iterator"""
+        body_id, exit_id = node.then_next, node.else_next
+        set_variable = self.context.set_variable
+        run_block, count_iteration = self._run_block, self._count_iteration
+        head_id = node.id
+        
+        # Taken out so a finished loop's iterator (and iterable) is not kept
+        for value in self._loop_iterators.pop(head_id, ()):
+            if iterator_var is not None:
+                set_variable(iterator_var, value)
+            stop_id = run_block(graph, body_id, head_id, exit_id)
+            if stop_id != head_id:
+                return stop_id  # break, or the program ended
+            count_iteration()
+        
+        return exit_id
     
     def _execute_function_call(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute function call"""
-        func_name = node.data['function']
-        args = node.data['arguments']
+        func_name, args = node.args
         
         # Evaluate arguments
         arg_values = [self._evaluate_expression(arg) for arg in args]
@@ -401,11 +732,11 @@ class VyraInterpreter:
         if self.debug:
             print(f"[DEBUG] Called function {func_name} with {arg_values}")
         
-        return self._get_next_node(graph, node)
+        return node.next_id
     
     def _execute_return(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute return statement"""
-        value_expr = node.data.get('value')
+        value_expr, = node.args
         
         if value_expr:
             self.context.return_value = self._evaluate_expression(value_expr)
@@ -421,12 +752,74 @@ class VyraInterpreter:
     
     def _execute_file_read(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
         """Execute file read"""
-        filepath_expr = node.data['filepath']
-        var_name = node.data['variable']
-        mode = node.data.get('mode', 'text')
+        filepath_expr, var_name, mode = node.args
         
         filepath = self._evaluate_expression(filepath_expr)
+        self._read_file_into(filepath, var_name, mode)
         
+        return node.next_id
+    
+    def _execute_file_write(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
+        """Execute file write"""
+        filepath_expr, content_expr, mode = node.args
+        
+        filepath = self._evaluate_expression(filepath_expr)
+        content = self._evaluate_expression(content_expr)
+        self._write_file(filepath, content, mode)
+        
+        return node.next_id
+    
+    def _execute_list_append(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
+        """Execute list append"""
+        list_expr, value_expr = node.args
+        
+        # Get list variable name
+        if list_expr['type'] == 'variable':
+            list_var = list_expr['name']
+            lst = self.context.get_variable(list_var)
+            value = self._evaluate_expression(value_expr)
+            
+            if not isinstance(lst, list):
+                lst = []
+                self.context.set_variable(list_var, lst)
+            
+            lst.append(value)
+            
+            if self.debug:
+                print(f"[DEBUG] Appended {value} to {list_var}")
+        
+        return node.next_id
+    
+    def _write_output(self, expressions: List[Dict], newline: bool):
+        """Evaluate displayed expressions and write them with a single write call"""
+        if len(expressions) == 1:
+            value = self._evaluate_expression(expressions[0])
+            text = value if type(value) is str else str(value)
+        else:
+            values = [self._evaluate_expression(expr) for expr in expressions]
+            text = ''.join([v if type(v) is str else str(v) for v in values])
+        self._write(text + '\n' if newline else text)
+    
+    def _read_input(self, prompt: str, input_type: str) -> Any:
+        """Prompt the user, converting numeric-looking answers to numbers"""
+        if input_type == 'password':
+            # getpass prompts on the terminal, not through sys.stdout
+            sys.stdout.flush()
+            value = getpass.getpass(prompt)
+        else:
+            value = input(prompt)
+        
+        # Try to convert to number if it looks like one
+        if input_type == 'number' or value.translate(_NUMBER_PUNCTUATION).isdigit():
+            try:
+                value = float(value) if '.' in value else int(value)
+            except ValueError:
+                pass
+        
+        return value
+    
+    def _read_file_into(self, filepath: Any, var_name: str, mode: str):
+        """Read a file into a variable, reporting (not raising) I/O errors"""
         try:
             with open(filepath, 'r') as f:
                 content = f.read()
@@ -440,18 +833,9 @@ class VyraInterpreter:
                 print(f"[DEBUG] Read file {filepath} into {var_name}")
         except Exception as e:
             print(f"Error reading file {filepath}: {e}")
-        
-        return self._get_next_node(graph, node)
     
-    def _execute_file_write(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Execute file write"""
-        filepath_expr = node.data['filepath']
-        content_expr = node.data['content']
-        mode = node.data.get('mode', 'text')
-        
-        filepath = self._evaluate_expression(filepath_expr)
-        content = self._evaluate_expression(content_expr)
-        
+    def _write_file(self, filepath: Any, content: Any, mode: str):
+        """Write a value to a file, reporting (not raising) I/O errors"""
         try:
             with open(filepath, 'w') as f:
                 if mode == 'json':
@@ -463,480 +847,832 @@ class VyraInterpreter:
                 print(f"[DEBUG] Wrote to file {filepath}")
         except Exception as e:
             print(f"Error writing file {filepath}: {e}")
-        
-        return self._get_next_node(graph, node)
     
-    def _execute_list_append(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Execute list append"""
-        list_expr = node.data['list']
-        value_expr = node.data['value']
-        
-        # Get list variable name
-        if list_expr['type'] == 'variable':
-            list_var = list_expr['name']
-            lst = self.context.get_variable(list_var)
-            value = self._evaluate_expression(value_expr)
-            
-            if not isinstance(lst, list):
-                lst = []
-                self.context.set_variable(list_var, lst)
-            
-            lst.append(value)
-            
-            if self.debug:
-                print(f"[DEBUG] Appended {value} to {list_var}")
+    # ------------------------------------------------------------------
+    # Bytecode handlers: each takes (frame, stack, arg, next_pc) and returns
+    # the pc to continue at (-1 stops the dispatch loop).
+    
+    def _build_op_handlers(self) -> List[Any]:
+        """Build the opcode -> handler table used by _run_code"""
+        table = {
+            OP_LOAD_CONST: self._op_load_const,
+            OP_LOAD_FAST: self._op_load_fast,
+            OP_STORE_FAST: self._op_store_fast,
+            OP_POP_TOP: self._op_pop_top,
+            OP_DUP_TOP: self._op_dup_top,
+            OP_BINARY_FAST_CONST: self._op_binary_fast_const,
+            OP_ADD: self._op_add,
+            OP_SUB: self._op_sub,
+            OP_MUL: self._op_mul,
+            OP_DIV: self._op_div,
+            OP_MOD: self._op_mod,
+            OP_POW: self._op_pow,
+            OP_EQ: self._op_eq,
+            OP_NE: self._op_ne,
+            OP_LT: self._op_lt,
+            OP_GT: self._op_gt,
+            OP_LE: self._op_le,
+            OP_GE: self._op_ge,
+            OP_JMP_IF_FALSE_OR_POP: self._op_jmp_if_false_or_pop,
+            OP_JMP_IF_TRUE_OR_POP: self._op_jmp_if_true_or_pop,
+            OP_NOT: self._op_not,
+            OP_BUILD_LIST: self._op_build_list,
+            OP_CALL_FUNCTION: self._op_call_function,
+            OP_CALL_BUILTIN: self._op_call_builtin,
+            OP_JUMP_BACKWARD: self._op_jump_backward,
+            OP_ENTER_TRACE: self._op_enter_trace,
+            OP_JMP: self._op_jmp,
+            OP_JMP_IF_FALSE: self._op_jmp_if_false,
+            OP_GET_ITER: self._op_get_iter,
+            OP_GET_REPEAT_ITER: self._op_get_repeat_iter,
+            OP_FOR_ITER: self._op_for_iter,
+            OP_PRINT: self._op_print,
+            OP_INPUT: self._op_input,
+            OP_READ_FILE: self._op_read_file,
+            OP_WRITE_FILE: self._op_write_file,
+            OP_LIST_APPEND: self._op_list_append,
+            OP_RETURN: self._op_return,
+        }
+        handlers = [None] * NUM_OPCODES
+        for op, handler in table.items():
+            handlers[op] = handler
+        return handlers
+    
+    def _op_load_const(self, frame, stack, arg, pc):
+        stack.append(arg)
+        return pc
+    
+    def _op_load_fast(self, frame, stack, arg, pc):
+        value = frame[arg]
+        if value is _UNBOUND:
+            raise NameError(f"Variable '{self._slot_name(arg)}' is not defined")
+        stack.append(value)
+        return pc
+    
+    def _op_store_fast(self, frame, stack, arg, pc):
+        frame[arg] = stack.pop()
+        return pc
+    
+    def _op_pop_top(self, frame, stack, arg, pc):
+        stack.pop()
+        return pc
+    
+    def _op_dup_top(self, frame, stack, arg, pc):
+        stack.append(stack[-1])
+        return pc
+    
+    def _op_add(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] + right
+        return pc
+    
+    def _op_sub(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] - right
+        return pc
+    
+    def _op_mul(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] * right
+        return pc
+    
+    def _op_div(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] / right if right != 0 else float('inf')
+        return pc
+    
+    def _op_mod(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] % right if right != 0 else 0
+        return pc
+    
+    def _op_pow(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] ** right
+        return pc
+    
+    def _op_binary_fast_const(self, frame, stack, arg, pc):
+        slot, _, const, func = arg
+        value = frame[slot]
+        if value is _UNBOUND:
+            raise NameError(f"Variable '{self._slot_name(slot)}' is not defined")
+        stack.append(func(value, const))
+        return pc
+    
+    def _op_eq(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] == right
+        return pc
+    
+    def _op_ne(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] != right
+        return pc
+    
+    def _op_lt(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] < right
+        return pc
+    
+    def _op_gt(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] > right
+        return pc
+    
+    def _op_le(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] <= right
+        return pc
+    
+    def _op_ge(self, frame, stack, arg, pc):
+        right = stack.pop()
+        stack[-1] = stack[-1] >= right
+        return pc
+    
+    def _op_jmp_if_false_or_pop(self, frame, stack, arg, pc):
+        if self._is_truthy(stack[-1]):
+            stack.pop()
+            return pc
+        stack[-1] = False
+        return arg
+    
+    def _op_jmp_if_true_or_pop(self, frame, stack, arg, pc):
+        if self._is_truthy(stack[-1]):
+            stack[-1] = True
+            return arg
+        stack.pop()
+        return pc
+    
+    def _op_not(self, frame, stack, arg, pc):
+        stack[-1] = not self._is_truthy(stack[-1])
+        return pc
+    
+    def _op_build_list(self, frame, stack, arg, pc):
+        start = len(stack) - arg
+        values = stack[start:]
+        del stack[start:]
+        stack.append(values)
+        return pc
+    
+    def _op_call_function(self, frame, stack, arg, pc):
+        name, nargs = arg
+        start = len(stack) - nargs
+        args = stack[start:]
+        del stack[start:]
+        stack.append(self._call_function(name, args))
+        return pc
+    
+    def _op_call_builtin(self, frame, stack, arg, pc):
+        _, nargs, func = arg
+        start = len(stack) - nargs
+        args = stack[start:]
+        del stack[start:]
+        stack.append(func(args))
+        return pc
+    
+    def _op_jmp(self, frame, stack, arg, pc):
+        self.iteration_count += 1
+        if self.iteration_count > self.max_iterations:
+            self._iterations_exceeded()
+        return arg
+    
+    def _op_jump_backward(self, frame, stack, arg, pc):
+        target = arg[0]
+        arg[1] += 1
+        if arg[1] >= HOT_LOOP_THRESHOLD:
+            # Hot loop: trace its blocks, then become a plain jump
+            TraceCompiler(_UNBOUND, self._is_truthy).compile_loop(self._instructions, target, pc - 1)
+            self._instructions[pc - 1] = (OP_JMP, target)
+        return self._op_jmp(frame, stack, target, pc)
+    
+    def _op_enter_trace(self, frame, stack, arg, pc):
+        trace, op, original_arg, _ = arg
+        next_pc = trace(frame, self)
+        if next_pc is DEOPT:
+            return self._op_handlers[op](frame, stack, original_arg, pc)
+        return next_pc
+    
+    def _op_jmp_if_false(self, frame, stack, arg, pc):
+        value = stack.pop()
+        # Comparisons already produce bools, so skip the truthiness rules for them
+        if value is True:
+            return pc
+        if value is False:
+            return arg
+        return pc if self._is_truthy(value) else arg
+    
+    def _op_get_iter(self, frame, stack, arg, pc):
+        frame[arg] = iter(stack.pop())
+        return pc
+    
+    def _op_get_repeat_iter(self, frame, stack, arg, pc):
+        frame[arg] = iter(range(int(stack.pop())))
+        return pc
+    
+    def _op_for_iter(self, frame, stack, arg, pc):
+        slot, exit_pc, var_slot = arg
+        try:
+            value = next(frame[slot])
+        except StopIteration:
+            return exit_pc
+        if var_slot is not None:
+            frame[var_slot] = value
+        return pc
+    
+    def _op_print(self, frame, stack, arg, pc):
+        count, end = arg
+        if count == 1:
+            value = stack.pop()
+            text = value if type(value) is str else str(value)
+        elif count == 0:
+            text = ''
+        else:
+            start = len(stack) - count
+            text = ''.join([v if type(v) is str else str(v) for v in stack[start:]])
+            del stack[start:]
         
-        return self._get_next_node(graph, node)
+        self._write(text + end if end else text)
+        return pc
+    
+    def _op_input(self, frame, stack, arg, pc):
+        prompt, input_type = arg
+        stack.append(self._read_input(prompt, input_type))
+        return pc
+    
+    def _op_read_file(self, frame, stack, arg, pc):
+        var_name, mode = arg
+        self._read_file_into(stack.pop(), var_name, mode)
+        return pc
+    
+    def _op_write_file(self, frame, stack, arg, pc):
+        content = stack.pop()
+        self._write_file(stack.pop(), content, arg)
+        return pc
+    
+    def _op_list_append(self, frame, stack, arg, pc):
+        value = stack.pop()
+        lst = stack.pop()
+        if not isinstance(lst, list):
+            lst = []
+            frame[arg] = lst
+        lst.append(value)
+        return pc
+    
+    def _op_return(self, frame, stack, arg, pc):
+        self.context.return_value = stack.pop()
+        self.context.should_return = True
+        return -1
     
     def _evaluate_expression(self, expr: Dict) -> Any:
-        """Evaluate an expression dictionary"""
+        """Evaluate an expression dictionary
+        
+        Each dictionary is compiled once into a tree of closures (cached by
+        identity for the current run), so evaluating it again reads no dict
+        keys and compares no operator strings.
+        """
         if expr is None:
             return None
+        return self._expression_code(expr)(self.context)
+    
+    def _expression_code(self, expr: Dict) -> Callable[[ExecutionContext], Any]:
+        """The compiled closure for an expression dictionary"""
+        cached = self._expr_code.get(id(expr))
+        if cached is None:
+            # Keep a reference to expr so its id cannot be reused while cached
+            cached = (expr, self._compile_statement_expression(self._expr_compiler.fold(expr)))
+            self._expr_code[id(expr)] = cached
+        return cached[1]
+    
+    def _compile_statement_expression(self, expr: Expr) -> Callable[[ExecutionContext], Any]:
+        """Like _compile_expression, but subtrees repeated in expr are computed once
         
-        expr_type = expr.get('type')
-        
-        if expr_type == 'literal':
-            return expr['value']
+        Each evaluation gets a fresh memo of the shared values (the VM keeps
+        them in scratch slots instead); the previous memo is restored after,
+        since a user function called from expr may evaluate it again.
+        """
+        repeated = Compiler.repeated_subexpressions(expr)
+        if not repeated:
+            return self._compile_expression(expr)
         
-        elif expr_type == 'list_literal':
-            return [self._evaluate_expression(e) for e in expr['elements']]
+        memo: List[Dict] = [{}]
+        code = self._compile_expression(expr, dict.fromkeys(repeated), memo)
         
-        elif expr_type == 'variable':
-            return self.context.get_variable(expr['name'])
+        def evaluate(ctx):
+            outer = memo[0]
+            memo[0] = {}
+            try:
+                return code(ctx)
+            finally:
+                memo[0] = outer
+        return evaluate
+    
+    def _compile_expression(self, expr: Expr, shared: Optional[Dict[Any, Callable]] = None,
+                            memo: Optional[List[Dict]] = None) -> Callable[[ExecutionContext], Any]:
+        """Closure computing a folded expression in a context, as the VM would
         
-        elif expr_type == 'binary_op':
-            left = self._evaluate_expression(expr['left'])
-            right = self._evaluate_expression(expr['right'])
-            op = expr['operator']
-            
-            if op == '+':
-                return left + right
-            elif op == '-':
-                return left - right
-            elif op == '*':
-                return left * right
-            elif op == '/':
-                return left / right if right != 0 else float('inf')
-            elif op == '%':
-                return left % right if right != 0 else 0
-            elif op == '**':
-                return left ** right
-        
-        elif expr_type == 'comparison':
-            left = self._evaluate_expression(expr['left'])
-            right = self._evaluate_expression(expr['right'])
-            op = expr['operator']
-            
-            if op == '==':
-                return left == right
-            elif op == '!=':
-                return left != right
-            elif op == '<':
-                return left < right
-            elif op == '>':
-                return left > right
-            elif op == '<=':
-                return left <= right
-            elif op == '>=':
-                return left >= right
-        
-        elif expr_type == 'logical_op':
-            op = expr['operator']
-            operands = expr['operands']
-            
-            if op == 'and':
-                result = True
-                for operand in operands:
-                    result = result and self._is_truthy(self._evaluate_expression(operand))
-                return result
-            elif op == 'or':
-                result = False
-                for operand in operands:
-                    result = result or self._is_truthy(self._evaluate_expression(operand))
-                return result
-            elif op == 'not':
-                return not self._is_truthy(self._evaluate_expression(operands[0]))
-        
-        elif expr_type == 'function_call':
-            func_name = expr['function']
-            args = [self._evaluate_expression(arg) for arg in expr['arguments']]
-            return self._call_function(func_name, args)
+        shared maps the keys of subtrees to compute once per evaluation to
+        their closures (None until compiled); their values are kept in memo[0].
+        """
+        kind = type(expr)
+        
+        if shared is not None and expr.key in shared:
+            code = shared[expr.key]
+            if code is None:
+                code = shared[expr.key] = self._compile_shared(expr, shared, memo)
+            return code
+        
+        if kind is Const:
+            value = expr.value
+            return lambda ctx: value
+        
+        if kind is Load:
+            name = expr.name
+            return lambda ctx: ctx.get_variable(name)
+        
+        if kind is BinOp:
+            left = self._compile_expression(expr.left, shared, memo)
+            right = self._compile_expression(expr.right, shared, memo)
+            if expr.opcode is None:
+                return lambda ctx: (left(ctx), right(ctx), None)[2]
+            func = FOLD_OPERATORS[expr.symbol]
+            # Operands that are variables or constants are read inline
+            left_kind, right_kind = type(expr.left), type(expr.right)
+            if left_kind is Load and right_kind is Const:
+                name, const = expr.left.name, expr.right.value
+                return lambda ctx: func(ctx.get_variable(name), const)
+            if left_kind is Load and right_kind is Load:
+                left_name, right_name = expr.left.name, expr.right.name
+                return lambda ctx: func(ctx.get_variable(left_name), ctx.get_variable(right_name))
+            if left_kind is Const and right_kind is Load:
+                const, name = expr.left.value, expr.right.name
+                return lambda ctx: func(const, ctx.get_variable(name))
+            return lambda ctx: func(left(ctx), right(ctx))
+        
+        if kind is Logical:
+            operands = [self._compile_expression(o, shared, memo) for o in expr.operands]
+            is_truthy = self._is_truthy
+            if expr.operator == 'not':
+                operand = operands[0]
+                return lambda ctx: not is_truthy(operand(ctx))
+            if expr.operator == 'and':
+                def logical_and(ctx):
+                    for operand in operands:
+                        if not is_truthy(operand(ctx)):
+                            return False
+                    return True
+                return logical_and
+            if expr.operator == 'or':
+                def logical_or(ctx):
+                    for operand in operands:
+                        if is_truthy(operand(ctx)):
+                            return True
+                    return False
+                return logical_or
+            return lambda ctx: None
+        
+        if kind is ListExpr:
+            elements = [self._compile_expression(e, shared, memo) for e in expr.elements]
+            return lambda ctx: [element(ctx) for element in elements]
+        
+        if kind is Call:
+            args = [self._compile_expression(a, shared, memo) for a in expr.args]
+            builtin = BUILTINS.get((expr.name or '').strip().lower())
+            if builtin is not None:
+                return lambda ctx: builtin([arg(ctx) for arg in args])
+            name, calls, resolve_call = expr.name, self._calls, self._resolve_call
+
+            def call(ctx):
+                invoke = calls.get(name) or resolve_call(name)
+                return invoke([arg(ctx) for arg in args])
+            return call
         
-        return None
+        return lambda ctx: None
+    
+    def _compile_shared(self, expr: Expr, shared: Dict[Any, Callable],
+                        memo: List[Dict]) -> Callable[[ExecutionContext], Any]:
+        """Closure computing expr at most once per evaluation of its statement"""
+        key = expr.key
+        del shared[key]  # compile the subtree itself, not a lookup of it
+        compute = self._compile_expression(expr, shared, memo)
+        shared[key] = None
+        
+        def shared_value(ctx):
+            values = memo[0]
+            if key in values:
+                return values[key]
+            value = values[key] = compute(ctx)
+            return value
+        return shared_value
     
     def _call_builtin(self, name: str, args: List[Any]) -> Any:
-        """Call built-in function"""
-        n = (name or '').strip().lower()
-
-        # Python bridge (opt-in)
-        # Usage from Vyra: Set x to call py_call with "math" and "sqrt" and 16.
-        if n in {'py_call', 'python_call'}:
-            enabled = os.getenv('VYRA_PY_BRIDGE', '0').strip().lower() in {'1', 'true', 'yes', 'on'}
-            if not enabled:
-                raise RuntimeError("Python bridge is disabled. Set VYRA_PY_BRIDGE=1 to enable.")
-
-            if len(args) < 2:
-                raise ValueError('py_call expects at least 2 arguments: module_name, function_path, [args...]')
-
-            module_name = str(args[0])
-            func_path = str(args[1])
-            call_args = args[2:]
-
-            allow_raw = os.getenv('VYRA_PY_ALLOW', '').strip()
-            allowed = {m.strip() for m in allow_raw.split(',') if m.strip()}
-            if module_name not in allowed:
-                raise RuntimeError(
-                    f"Python module '{module_name}' is not allowed. "
-                    "Set VYRA_PY_ALLOW to a comma-separated allowlist (e.g., VYRA_PY_ALLOW=math,json)."
-                )
-
-            mod = importlib.import_module(module_name)
-            target: Any = mod
-            for part in func_path.split('.'):
-                if not part:
-                    continue
-                target = getattr(target, part)
-
-            if not callable(target):
-                raise TypeError(f"Python target '{module_name}.{func_path}' is not callable")
-
-            return target(*call_args)
-
-        # Type / basics
-        if n in ['len', 'length']:
-            return len(args[0]) if args else 0
-        if n in ['str', 'to_string', 'string']:
-            return str(args[0]) if args else ""
-        if n in ['int', 'to_int']:
-            return int(args[0]) if args else 0
-        if n in ['float', 'to_float']:
-            return float(args[0]) if args else 0.0
-        if n == 'type_of':
-            return type(args[0]).__name__ if args else 'none'
-
-        # Math
-        if n == 'abs':
-            return abs(args[0]) if args else 0
-        if n == 'round':
-            return round(args[0]) if args else 0
-        if n == 'floor':
-            return math.floor(args[0]) if args else 0
-        if n == 'ceil':
-            return math.ceil(args[0]) if args else 0
-        if n == 'sqrt':
-            return math.sqrt(args[0]) if args else 0
-        if n == 'sin':
-            return math.sin(args[0]) if args else 0
-        if n == 'cos':
-            return math.cos(args[0]) if args else 0
-        if n == 'tan':
-            return math.tan(args[0]) if args else 0
-        if n == 'log':
-            return math.log(args[0]) if args else 0
-        if n == 'exp':
-            return math.exp(args[0]) if args else 0
-
-        # String
-        if n in ['uppercase', 'upper']:
-            return str(args[0]).upper() if args else ""
-        if n in ['lowercase', 'lower']:
-            return str(args[0]).lower() if args else ""
-        if n == 'substring':
-            s = str(args[0]) if args else ""
-            start = int(args[1]) if len(args) > 1 else 0
-            end = int(args[2]) if len(args) > 2 else None
-            return s[start:end]
-        if n == 'split':
-            s = str(args[0]) if args else ""
-            sep = str(args[1]) if len(args) > 1 else None
-            return s.split(sep)
-        if n == 'join':
-            sep = str(args[0]) if args else ""
-            items = args[1] if len(args) > 1 else []
-            return sep.join([str(x) for x in items])
-        if n == 'replace':
-            s = str(args[0]) if args else ""
-            old = str(args[1]) if len(args) > 1 else ""
-            new = str(args[2]) if len(args) > 2 else ""
-            return s.replace(old, new)
-
-        # List / collections
-        if n == 'append':
-            lst = args[0] if args else []
-            val = args[1] if len(args) > 1 else None
-            if isinstance(lst, list):
-                lst.append(val)
-            return lst
-        if n == 'remove':
-            lst = args[0] if args else []
-            val = args[1] if len(args) > 1 else None
-            if isinstance(lst, list) and val in lst:
-                lst.remove(val)
-            return lst
-        if n == 'sort':
-            lst = args[0] if args else []
-            if isinstance(lst, list):
-                lst.sort()
-            return lst
-
-        # Time
-        if n == 'current_time':
-            return datetime.now().isoformat()
-        if n == 'timestamp':
-            return time.time()
-        if n == 'sleep':
-            seconds = float(args[0]) if args else 0.0
-            time.sleep(max(0.0, seconds))
-            return None
-
-        # Random
-        if n == 'random_number':
-            if len(args) >= 2:
-                return random.uniform(float(args[0]), float(args[1]))
-            return random.random()
-        if n == 'random_choice':
-            seq = args[0] if args else []
-            return random.choice(seq) if seq else None
-        if n == 'shuffle':
-            seq = args[0] if args else []
-            if isinstance(seq, list):
-                random.shuffle(seq)
-            return seq
-
-        return None
+        """Call built-in function (_NO_BUILTIN if there is no built-in of that name)"""
+        func = BUILTINS.get((name or '').strip().lower())
+        if func is None:
+            return _NO_BUILTIN
+        return func(args)
 
     def _call_function(self, name: str, args: List[Any]) -> Any:
         """Call either a built-in or a user-defined function."""
-        # Prefer built-ins when available
-        builtin_result = self._call_builtin(name, args)
-        if builtin_result is not None or (name or '').strip().lower() in {
-            'sleep', 'append', 'remove', 'sort', 'shuffle'
-        }:
-            return builtin_result
-
-        if name not in self.context.functions:
-            raise NameError(f"Function '{name}' is not defined")
+        invoke = self._calls.get(name) or self._resolve_call(name)
+        return invoke(args)
 
-        if self.call_depth >= self.max_call_depth:
-            raise RuntimeError(f"Exceeded maximum call depth ({self.max_call_depth}).")
+    def _resolve_call(self, name: str) -> Callable[[List[Any]], Any]:
+        """Invoker taking the argument list, resolved once per name per run
+        
+        Compiled call sites look the invoker up in _calls themselves, so a
+        recursive Vyra call costs one Python frame for the invoker and one
+        for the body.
+        """
+        # Prefer built-ins when available
+        builtin = BUILTINS.get((name or '').strip().lower())
+        if builtin is not None:
+            self._calls[name] = builtin
+            return builtin
 
         func = self.context.get_function(name)
-        params = func.get('params', [])
-        body = func.get('body', [])
+        varnames, slots = func['varnames'], func['slots']
+        param_slots = [slots[param] for param in func.get('params', [])]
+        body = self._body_code(func.get('body', []))
+        context = self.context
 
-        self.call_depth += 1
-        self.context.push_scope()
-        try:
-            for param, value in zip(params, args):
-                self.context.set_variable(param, value)
+        def invoke(args):
+            if self.call_depth >= self.max_call_depth:
+                raise RuntimeError(f"Exceeded maximum call depth ({self.max_call_depth}).")
+            self.call_depth += 1
+            context.push_scope(varnames, slots)
+            try:
+                frame = context.locals
+                for slot, value in zip(param_slots, args):
+                    frame[slot] = value
 
-            status, value = self._execute_serialized_statements(body)
-            if status == 'return':
-                return value
-            return None
-        finally:
-            self.context.pop_scope()
-            self.call_depth -= 1
+                result = body(context)
+                if result is not None and result[0] == 'return':
+                    return result[1]
+                return None
+            finally:
+                context.pop_scope()
+                self.call_depth -= 1
+        self._calls[name] = invoke
+        return invoke
 
     def _execute_serialized_statements(self, statements: List[Dict]) -> tuple[str, Any]:
         """Execute a list of serialized statements.
 
         Returns (status, value) where status is one of: 'ok', 'return', 'break', 'continue'.
         """
-        for stmt in statements or []:
-            status, value = self._execute_serialized_statement(stmt)
-            if status != 'ok':
-                return status, value
-        return 'ok', None
+        result = self._body_code(statements)(self.context)
+        return ('ok', None) if result is None else result
 
-    def _execute_serialized_statement(self, stmt: Dict) -> tuple[str, Any]:
-        t = (stmt or {}).get('type')
+    def _body_code(self, statements: List[Dict]) -> Callable[[ExecutionContext], Optional[tuple]]:
+        """The compiled closure for a statement list, cached by identity for the current run"""
+        cached = self._body_cache.get(id(statements))
+        if cached is None:
+            # Keep a reference to statements so its id cannot be reused while cached
+            cached = (statements, self._compile_body(statements))
+            self._body_cache[id(statements)] = cached
+        return cached[1]
+
+    def _compile_body(self, statements: List[Dict]) -> Callable[[ExecutionContext], Optional[tuple]]:
+        """Closure running serialized statements in order
+
+        Each statement is compiled once into a closure that returns None to
+        go on, or (status, value) for return/break/continue, which ends the
+        block. Loops and ifs run their compiled bodies directly. Runs of
+        assignments are stored by a single closure.
+        """
+        steps = []
+        for assigning, group in groupby(statements or (), key=lambda stmt: (stmt or {}).get('type') == 'assignment'):
+            group = list(group)
+            if assigning and len(group) > 1:
+                steps.append(self._compile_assignments(group))
+            else:
+                steps += [self._compile_statement(stmt) for stmt in group]
+        steps = [step for step in steps if step is not None]
+        if not steps:
+            return _empty_body
+        if len(steps) == 1:
+            return steps[0]
+
+        def run_body(ctx):
+            for step in steps:
+                result = step(ctx)
+                if result is not None:
+                    return result
+            return None
+        return run_body
+
+    def _compile_assignments(self, statements: List[Dict]) -> Callable[[ExecutionContext], None]:
+        """Closure for consecutive assignments, stored one after another"""
+        code = self._expression_code
+        stores = [(stmt['variable'], code(stmt.get('value'))) for stmt in statements]
 
-        if t == 'noop' or t is None:
-            return 'ok', None
+        def assign_all(ctx):
+            set_variable = ctx.set_variable
+            for var_name, value in stores:
+                set_variable(var_name, value(ctx))
+        return assign_all
+
+    def _compile_statement(self, stmt: Dict) -> Optional[Callable[[ExecutionContext], Optional[tuple]]]:
+        """Closure for one serialized statement (None if it does nothing)"""
+        t = (stmt or {}).get('type')
+        code = self._expression_code
 
         if t == 'assignment':
-            var_name = stmt['variable']
-            value = self._evaluate_expression(stmt.get('value'))
-            self.context.set_variable(var_name, value)
-            return 'ok', None
+            var_name, value = stmt['variable'], code(stmt.get('value'))
+            return lambda ctx: ctx.set_variable(var_name, value(ctx))
 
         if t == 'output':
-            outputs = []
-            for expr in stmt.get('expressions', []):
-                outputs.append(str(self._evaluate_expression(expr)))
-            text = ''.join(outputs)
-            if stmt.get('newline', True):
-                print(text)
+            values = [code(expr) for expr in stmt.get('expressions', [])]
+            end = '\n' if stmt.get('newline', True) else ''
+            if len(values) == 1:
+                value, = values
+
+                def output(ctx):
+                    text = value(ctx)
+                    self._write((text if type(text) is str else str(text)) + end)
             else:
-                print(text, end='')
-            return 'ok', None
+                def output(ctx):
+                    texts = [value(ctx) for value in values]
+                    self._write(''.join([v if type(v) is str else str(v) for v in texts]) + end)
+            return output
 
         if t == 'input':
             prompt = stmt.get('prompt', '')
             var = stmt.get('variable')
             input_type = stmt.get('input_type', 'string')
-            if input_type == 'password':
-                import getpass
-                value = getpass.getpass(prompt)
-            else:
-                value = input(prompt)
-            if input_type == 'number' or (isinstance(value, str) and value.replace('.', '').replace('-', '').isdigit()):
-                try:
-                    value = float(value) if '.' in value else int(value)
-                except ValueError:
-                    pass
-            if var:
-                self.context.set_variable(var, value)
-            return 'ok', None
+
+            def read_input(ctx):
+                value = self._read_input(prompt, input_type)
+                if var:
+                    ctx.set_variable(var, value)
+            return read_input
 
         if t == 'function_call':
             func_name = stmt.get('function')
-            args = [self._evaluate_expression(a) for a in stmt.get('arguments', [])]
-            self._call_function(func_name, args)
-            return 'ok', None
+            args = [code(a) for a in stmt.get('arguments', [])]
+            calls, resolve_call = self._calls, self._resolve_call
+
+            def function_call(ctx):
+                invoke = calls.get(func_name) or resolve_call(func_name)
+                invoke([arg(ctx) for arg in args])
+            return function_call
 
         if t == 'return':
-            value_expr = stmt.get('value')
-            value = self._evaluate_expression(value_expr) if value_expr is not None else None
-            return 'return', value
+            value = code(stmt.get('value'))
+            return lambda ctx: ('return', value(ctx))
 
         if t == 'break':
-            return 'break', None
+            return lambda ctx: _BREAK
 
         if t == 'continue':
-            return 'continue', None
+            return lambda ctx: _CONTINUE
 
         if t == 'list_append':
             list_expr = stmt.get('list')
-            value_expr = stmt.get('value')
-            if list_expr and list_expr.get('type') == 'variable':
-                list_var = list_expr.get('name')
-                lst = self.context.get_variable(list_var)
-                value = self._evaluate_expression(value_expr)
+            if not (list_expr and list_expr.get('type') == 'variable'):
+                return None
+            list_var, value = list_expr.get('name'), code(stmt.get('value'))
+
+            def list_append(ctx):
+                lst = ctx.get_variable(list_var)
+                item = value(ctx)
                 if not isinstance(lst, list):
                     lst = []
-                    self.context.set_variable(list_var, lst)
-                lst.append(value)
-            return 'ok', None
+                    ctx.set_variable(list_var, lst)
+                lst.append(item)
+            return list_append
 
         if t == 'file_read':
-            filepath = self._evaluate_expression(stmt.get('filepath'))
-            var_name = stmt.get('variable')
+            filepath, var_name = code(stmt.get('filepath')), stmt.get('variable')
             mode = stmt.get('mode', 'text')
-            try:
-                with open(filepath, 'r') as f:
-                    content = f.read()
-                if mode == 'json':
-                    content = json.loads(content)
-                if var_name:
-                    self.context.set_variable(var_name, content)
-            except Exception as e:
-                print(f"Error reading file {filepath}: {e}")
-            return 'ok', None
+
+            def file_read(ctx):
+                path = filepath(ctx)
+                try:
+                    with open(path, 'r') as f:
+                        content = f.read()
+                    if mode == 'json':
+                        content = json.loads(content)
+                    if var_name:
+                        ctx.set_variable(var_name, content)
+                except Exception as e:
+                    print(f"Error reading file {path}: {e}")
+            return file_read
 
         if t == 'file_write':
-            filepath = self._evaluate_expression(stmt.get('filepath'))
-            content = self._evaluate_expression(stmt.get('content'))
+            filepath, content = code(stmt.get('filepath')), code(stmt.get('content'))
             mode = stmt.get('mode', 'text')
-            try:
-                with open(filepath, 'w') as f:
-                    if mode == 'json':
-                        json.dump(content, f, indent=2)
-                    else:
-                        f.write(str(content))
-            except Exception as e:
-                print(f"Error writing file {filepath}: {e}")
-            return 'ok', None
+
+            return lambda ctx: self._write_file(filepath(ctx), content(ctx), mode)
 
         if t == 'if':
-            cond = self._evaluate_expression(stmt.get('condition'))
-            branch = stmt.get('then', []) if self._is_truthy(cond) else stmt.get('else', [])
-            return self._execute_serialized_statements(branch)
+            condition, is_truthy = code(stmt.get('condition')), self._is_truthy
+            then_body = self._compile_body(stmt.get('then', []))
+            else_body = self._compile_body(stmt.get('else', []))
+            return lambda ctx: then_body(ctx) if is_truthy(condition(ctx)) else else_body(ctx)
+
+        if t in ('while', 'repeat', 'for_each'):
+            return self._compile_loop(stmt)
+
+        # Unknown statement type
+        return None
+
+    def _compile_loop(self, stmt: Dict) -> Callable[[ExecutionContext], Optional[tuple]]:
+        """Closure for a serialized while/repeat/for_each loop"""
+        t = stmt['type']
+        code = self._expression_code
+        body = self._compile_body(stmt.get('body', []))
+        count_iteration = self._count_iteration
+
+        def run_passes(ctx, passes):
+            for _ in passes:
+                count_iteration()
+                result = body(ctx)
+                if result is not None:
+                    if result is _BREAK:
+                        break
+                    if result is not _CONTINUE:
+                        return result
+            return None
+
+        if self._is_leaf_body([stmt.get(key) for key in ('condition', 'count', 'iterable', 'body')]):
+            # Nothing in the loop counts iterations itself, so the passes are
+            # counted in a local and added to iteration_count when the loop ends
+            def run_passes(ctx, passes):
+                budget = self.max_iterations - self.iteration_count
+                done = 0
+                try:
+                    for _ in passes:
+                        done += 1
+                        if done > budget:
+                            self._iterations_exceeded()
+                        result = body(ctx)
+                        if result is not None:
+                            if result is _BREAK:
+                                break
+                            if result is not _CONTINUE:
+                                return result
+                    return None
+                finally:
+                    self.iteration_count += done
 
         if t == 'while':
-            while self._is_truthy(self._evaluate_expression(stmt.get('condition'))):
-                self.iteration_count += 1
-                if self.iteration_count > self.max_iterations:
-                    raise RuntimeError(f"Exceeded maximum iterations ({self.max_iterations}). Possible infinite loop.")
-                status, value = self._execute_serialized_statements(stmt.get('body', []))
-                if status == 'return':
-                    return status, value
-                if status == 'break':
-                    break
-                if status == 'continue':
-                    continue
-            return 'ok', None
+            condition, is_truthy = code(stmt.get('condition')), self._is_truthy
+
+            def passes(ctx):
+                while is_truthy(condition(ctx)):
+                    yield
+            return lambda ctx: run_passes(ctx, passes(ctx))
 
         if t == 'repeat':
-            count = int(self._evaluate_expression(stmt.get('count')) or 0)
-            for _ in range(max(0, count)):
-                self.iteration_count += 1
-                if self.iteration_count > self.max_iterations:
-                    raise RuntimeError(f"Exceeded maximum iterations ({self.max_iterations}). Possible infinite loop.")
-                status, value = self._execute_serialized_statements(stmt.get('body', []))
-                if status == 'return':
-                    return status, value
-                if status == 'break':
-                    break
-                if status == 'continue':
-                    continue
-            return 'ok', None
-
-        if t == 'for_each':
-            iterator_name = stmt.get('iterator')
-            iterable = self._evaluate_expression(stmt.get('iterable'))
-            for item in (iterable or []):
-                self.iteration_count += 1
-                if self.iteration_count > self.max_iterations:
-                    raise RuntimeError(f"Exceeded maximum iterations ({self.max_iterations}). Possible infinite loop.")
-                self.context.set_variable(iterator_name, item)
-                status, value = self._execute_serialized_statements(stmt.get('body', []))
-                if status == 'return':
-                    return status, value
-                if status == 'break':
-                    break
-                if status == 'continue':
-                    continue
-            return 'ok', None
+            count = code(stmt.get('count'))
+
+            def repeat_count(ctx):
+                value = count(ctx)
+                return 0 if value is None else max(0, int(value))
+
+            fixed = None
+            folded = self._expr_compiler.fold(stmt.get('count'))
+            if type(folded) is Const and type(folded.value) in (int, bool):
+                # A literal count is converted once, not on every run of the loop
+                fixed = max(0, int(folded.value))
+                repeat_count = lambda ctx: fixed
+
+            if body is _empty_body:
+                # Nothing to run: count the passes in one go if they fit the budget
+                def skip_repeat(ctx):
+                    passes = repeat_count(ctx)
+                    if self.iteration_count + passes > self.max_iterations:
+                        return run_passes(ctx, range(passes))
+                    self.iteration_count += passes
+                return skip_repeat
+
+            unroll = fixed if fixed is not None and fixed <= UNROLL_LIMIT else None
+            kernel = self._compile_repeat_kernel(stmt.get('body', []), unroll=unroll)
+            if kernel is None:
+                return lambda ctx: run_passes(ctx, range(repeat_count(ctx)))
+
+            kernel, names, assigned = kernel
+
+            def run_repeat(ctx):
+                passes = repeat_count(ctx)
+                if passes and self.iteration_count + passes <= self.max_iterations:
+                    try:
+                        values = [ctx.get_variable(name) for name in names]
+                    except NameError:
+                        values = None  # the body defines it; run it statement by statement
+                    if values is not None:
+                        self.iteration_count += passes
+                        out = []
+                        try:
+                            kernel(passes, out, *values)
+                        finally:
+                            for name, value in zip(assigned, out):
+                                ctx.set_variable(name, value)
+                        return None
+                return run_passes(ctx, range(passes))
+            return run_repeat
+
+        iterator_name, iterable = stmt.get('iterator'), code(stmt.get('iterable'))
+
+        def passes(ctx, items):
+            if items is None:
+                return
+            # Store into the iterator's frame slot, found once per loop
+            frame, slot = ctx.locals, ctx.local_slots.get(iterator_name)
+            for item in items:
+                if slot is None:
+                    ctx.set_variable(iterator_name, item)
+                    slot = ctx.local_slots[iterator_name]
+                else:
+                    frame[slot] = item
+                yield
+
+        if body is _empty_body:
+            # Nothing to run: only the iterator's last value and the count are left
+            def skip_for_each(ctx):
+                items = iterable(ctx)
+                if (type(items) not in (list, tuple, str) or not items
+                        or self.iteration_count + len(items) > self.max_iterations):
+                    return run_passes(ctx, passes(ctx, items))
+                self.iteration_count += len(items)
+                ctx.set_variable(iterator_name, items[-1])
+            return skip_for_each
+
+        kernel = self._compile_repeat_kernel(stmt.get('body', []), iterator_name)
+        if kernel is None:
+            return lambda ctx: run_passes(ctx, passes(ctx, iterable(ctx)))
+
+        kernel, names, assigned = kernel
+
+        def run_for_each(ctx):
+            items = iterable(ctx)
+            if (type(items) in (list, tuple, str, dict) and items
+                    and self.iteration_count + len(items) <= self.max_iterations):
+                try:
+                    values = [ctx.get_variable(name) for name in names]
+                except NameError:
+                    values = None
+                if values is not None:
+                    self.iteration_count += len(items)
+                    out = []
+                    try:
+                        kernel(items, out, *values)
+                    finally:
+                        for name, value in zip(assigned, out):
+                            ctx.set_variable(name, value)
+                    return None
+            return run_passes(ctx, passes(ctx, items))
+        return run_for_each
+
+    @staticmethod
+    def _is_leaf_body(value: Any) -> bool:
+        """Whether serialized statements contain no loops and call no user functions"""
+        if isinstance(value, dict):
+            kind = value.get('type')
+            if kind in ('while', 'repeat', 'for_each'):
+                return False
+            if kind == 'function_call' and (value.get('function') or '').strip().lower() not in BUILTINS:
+                return False
+            return all(VyraInterpreter._is_leaf_body(item) for item in value.values())
+        if isinstance(value, list):
+            return all(VyraInterpreter._is_leaf_body(item) for item in value)
+        return True
+
+    def _compile_repeat_kernel(self, statements: List[Dict], iterator: Optional[str] = None,
+                               unroll: Optional[int] = None) -> Optional[tuple]:
+        """(kernel, names, assigned) for an arithmetic-only repeat or for_each body, else None
+        
+        See Compiler.emit_repeat_kernel; the kernel runs the whole loop as
+        one Python function instead of a closure call per statement per pass.
+        """
+        compiler = Compiler(BUILTINS, self._is_truthy)
+        emitted = compiler.emit_repeat_kernel(statements, iterator, unroll)
+        if emitted is None:
+            return None
+        source, names, assigned = emitted
+        namespace = dict(compiler.python_globals, _truthy=self._is_truthy)
+        exec(compile(source, '<vyra kernel>', 'exec'), namespace)
+        return namespace['kernel'], names, assigned
 
-        # Unknown statement type
-        return 'ok', None
-    
     def _is_truthy(self, value: Any) -> bool:
         """Check if value is truthy"""
-        if isinstance(value, bool):
+        t = type(value)
+        if t is bool:
             return value
-        if isinstance(value, (int, float)):
+        if t is int or t is float:
             return value != 0
-        if isinstance(value, str):
-            return value.lower() not in ['false', 'no', '', '0']
+        if t is str:
+            # No falsy spelling is longer than 'false'; skip lowering long text
+            return len(value) > 5 or value.lower() not in _FALSY_STRINGS
         if value is None:
             return False
+        if isinstance(value, (int, float)):
+            return value != 0
+        if isinstance(value, str):
+            return value.lower() not in _FALSY_STRINGS
         return bool(value)
     
     def _get_next_node(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Get next node in linear flow"""
-        if node.successors:
-            return node.successors[0]
-        return None
-    
-    def _find_break_target(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Find loop exit node for break"""
-        for succ_id in node.successors:
-            edge = graph.graph[node.id][succ_id]
-            if edge.get('type') == 'break_to':
-                return succ_id
-        if node.successors:
-            return node.successors[0]
-        return None
-    
-    def _find_continue_target(self, graph: LogicGraph, node: GraphNode) -> Optional[int]:
-        """Find loop condition node for continue"""
-        for succ_id in node.successors:
-            edge = graph.graph[node.id][succ_id]
-            if edge.get('type') == 'continue_to':
-                return succ_id
-        if node.successors:
-            return node.successors[0]
-        return None
+        """Get next node in linear flow (handler for nodes that do nothing)"""
+        return node.next_id
@@ -0,0 +1,282 @@
+"""Vyra Trace JIT - Compiles hot straight-line bytecode to Python functions.
+
+When a loop's back edge has been taken often enough, every basic block in the
+loop is translated into Python source (one statement per STORE/PRINT, operands
+inlined as expressions), compiled with exec() and installed in place of the
+block's first instruction as OP_ENTER_TRACE. A trace runs the whole block in
+one call and returns the pc to continue at.
+
+Traces guard on the slots they read before writing; if one is still unbound
+the trace returns DEOPT and the interpreter runs the original instruction so
+the usual NameError is raised.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from .bytecode import (
+    BINARY_OPCODES, COMPARISON_OPCODES, FOLD_OPERATORS, Instruction, OP_ADD,
+    OP_BINARY_FAST_CONST, OP_BUILD_LIST, OP_CALL_BUILTIN, OP_DIV, OP_DUP_TOP, OP_ENTER_TRACE,
+    OP_EQ, OP_FOR_ITER, OP_GE, OP_GT, OP_JMP, OP_JMP_IF_FALSE, OP_JMP_IF_FALSE_OR_POP,
+    OP_JMP_IF_TRUE_OR_POP, OP_JUMP_BACKWARD, OP_LE, OP_LOAD_CONST, OP_LOAD_FAST, OP_LT, OP_MOD,
+    OP_MUL, OP_NE, OP_NOT, OP_POP_TOP, OP_POW, OP_PRINT, OP_STORE_FAST, OP_SUB,
+)
+
+
+# Back-edge hits before a loop is traced
+HOT_LOOP_THRESHOLD = 50
+
+# Returned by a trace whose guards fail
+DEOPT = object()
+
+# Operators that can be written inline; '/' and '%' go through helpers so
+# division by zero behaves like the VM (inf / 0)
+_INLINE_OPERATORS = {
+    OP_ADD: '+', OP_SUB: '-', OP_MUL: '*', OP_POW: '**',
+    OP_EQ: '==', OP_NE: '!=', OP_LT: '<', OP_GT: '>', OP_LE: '<=', OP_GE: '>=',
+}
+_HELPER_OPERATORS = {OP_DIV: '_div', OP_MOD: '_mod'}
+_SYMBOL_OPCODES = {**BINARY_OPCODES, **COMPARISON_OPCODES}
+
+# Instructions a trace can contain (besides FOR_ITER first and JMP_IF_FALSE last)
+_TRACEABLE = frozenset({
+    OP_LOAD_CONST, OP_LOAD_FAST, OP_STORE_FAST, OP_POP_TOP, OP_DUP_TOP,
+    OP_BINARY_FAST_CONST, OP_NOT, OP_BUILD_LIST, OP_CALL_BUILTIN, OP_PRINT,
+    *_INLINE_OPERATORS, *_HELPER_OPERATORS,
+})
+
+
+def _to_text(value: Any) -> str:
+    return value if type(value) is str else str(value)
+
+
+def jump_targets(instructions: List[Instruction]) -> Set[int]:
+    """Every pc some instruction can jump to"""
+    targets = set()
+    for op, arg in instructions:
+        if op in (OP_JMP, OP_JMP_IF_FALSE, OP_JMP_IF_FALSE_OR_POP, OP_JMP_IF_TRUE_OR_POP):
+            targets.add(arg)
+        elif op == OP_JUMP_BACKWARD:
+            targets.add(arg[0])
+        elif op == OP_FOR_ITER:
+            targets.add(arg[1])
+    return targets
+
+
+class _Value:
+    """A value on the symbolic stack: Python source plus the slots it reads"""
+    __slots__ = ('source', 'slots')
+
+    def __init__(self, source: str, slots: frozenset = frozenset()):
+        self.source = source
+        self.slots = slots
+
+
+class TraceCompiler:
+    """Translates basic blocks of a CodeObject into Python functions"""
+
+    def __init__(self, unbound: Any, is_truthy: Callable[[Any], bool]):
+        self.unbound = unbound
+        self.is_truthy = is_truthy
+
+    def compile_loop(self, instructions: List[Instruction], start: int, end: int) -> int:
+        """Install traces for the blocks in instructions[start:end]; returns how many"""
+        targets = jump_targets(instructions)
+        installed = 0
+        pc = start
+        while pc < end:
+            op = instructions[pc][0]
+            if op == OP_ENTER_TRACE:
+                pc = instructions[pc][1][3]
+                continue
+            trace = self.compile_block(instructions, pc, targets)
+            if trace is None:
+                pc += 1
+                continue
+            fn, block_end = trace
+            instructions[pc] = (OP_ENTER_TRACE, (fn, op, instructions[pc][1], block_end))
+            installed += 1
+            pc = block_end
+        return installed
+
+    def compile_block(self, instructions: List[Instruction], start: int,
+                      targets: Set[int]) -> Optional[Tuple[Callable, int]]:
+        """Compile the block starting at start; None if it is too short to pay off"""
+        self.lines: List[str] = []
+        self.stack: List[_Value] = []
+        self.env: Dict[str, Any] = {
+            '_UNBOUND': self.unbound, 'DEOPT': DEOPT, '_truthy': self.is_truthy,
+            '_text': _to_text, '_div': FOLD_OPERATORS['/'], '_mod': FOLD_OPERATORS['%'],
+        }
+        self.written: Set[int] = set()
+        self.guarded: List[int] = []
+        self.ntemps = 0
+
+        pc = start
+        exit_pc = None
+        clean = (0, start)  # (lines emitted, pc) at the last empty-stack point
+
+        op, arg = instructions[pc]
+        if op == OP_FOR_ITER:
+            slot, loop_exit, var_slot = arg
+            self._read(slot)
+            value = self._temp()
+            self.lines += [
+                'try:',
+                f'    {value} = next(frame[{slot}])',
+                'except StopIteration:',
+                f'    return {loop_exit}',
+            ]
+            if var_slot is not None:
+                self.lines.append(f'frame[{var_slot}] = {value}')
+                self.written.add(var_slot)
+            pc += 1
+            clean = (len(self.lines), pc)
+
+        while pc < len(instructions) and (pc == start or pc not in targets):
+            op, arg = instructions[pc]
+            if op == OP_JMP_IF_FALSE:
+                if not self.stack:
+                    break
+                condition = self._materialize(self.stack.pop())
+                fall = pc + 1
+                self.lines += [
+                    f'if {condition} is True: return {fall}',
+                    f'if {condition} is False: return {arg}',
+                    f'return {fall} if _truthy({condition}) else {arg}',
+                ]
+                exit_pc = pc + 1
+                break
+            if op not in _TRACEABLE or not self._translate(op, arg):
+                break
+            pc += 1
+            if not self.stack:
+                clean = (len(self.lines), pc)
+
+        if exit_pc is None:
+            # Stop at the last point where nothing was left on the stack
+            del self.lines[clean[0]:]
+            pc = clean[1]
+            if pc - start < 2:
+                return None
+            self.lines.append(f'return {pc}')
+            exit_pc = pc
+
+        guards = ' or '.join(f'frame[{slot}] is _UNBOUND' for slot in self.guarded)
+        body = ([f'if {guards}: return DEOPT'] if guards else []) + self.lines
+        source = 'def trace(frame, vm):\n' + ''.join(f'    {line}\n' for line in body)
+        exec(compile(source, f'<vyra trace @{start}>', 'exec'), self.env)
+        fn = self.env['trace']
+        fn.source = source
+        return fn, exit_pc
+
+    # ------------------------------------------------------------------
+
+    def _temp(self) -> str:
+        name = f't{self.ntemps}'
+        self.ntemps += 1
+        return name
+
+    def _const(self, value: Any) -> str:
+        if type(value) in (bool, int, str) or value is None:
+            text = repr(value)
+            # '-2 ** n' would read as -(2 ** n)
+            return f'({text})' if text.startswith('-') else text
+        name = f'k{len(self.env)}'
+        self.env[name] = value
+        return name
+
+    def _read(self, slot: int) -> str:
+        if slot not in self.written and slot not in self.guarded:
+            self.guarded.append(slot)
+        return f'frame[{slot}]'
+
+    def _materialize(self, value: _Value) -> str:
+        """Evaluate value now (into a temporary unless it is trivial)"""
+        if value.source.isidentifier() or not value.slots and value.source[:1].isdigit():
+            return value.source
+        name = self._temp()
+        self.lines.append(f'{name} = {value.source}')
+        return name
+
+    def _flush(self):
+        """Evaluate pending stack values now, keeping the VM's evaluation order"""
+        for index, value in enumerate(self.stack):
+            self.stack[index] = _Value(self._materialize(value))
+
+    def _binary(self, op: int, left: _Value, right: _Value) -> _Value:
+        slots = left.slots | right.slots
+        if op in _HELPER_OPERATORS:
+            return _Value(f'{_HELPER_OPERATORS[op]}({left.source}, {right.source})', slots)
+        return _Value(f'({left.source} {_INLINE_OPERATORS[op]} {right.source})', slots)
+
+    def _translate(self, op: int, arg: Any) -> bool:
+        """Append the Python form of one instruction; False if it cannot be traced"""
+        stack = self.stack
+
+        if op == OP_LOAD_CONST:
+            stack.append(_Value(self._const(arg)))
+        elif op == OP_LOAD_FAST:
+            stack.append(_Value(self._read(arg), frozenset((arg,))))
+        elif op == OP_BINARY_FAST_CONST:
+            slot, symbol, const, _ = arg
+            left = _Value(self._read(slot), frozenset((slot,)))
+            stack.append(self._binary(_SYMBOL_OPCODES[symbol], left, _Value(self._const(const))))
+        elif not stack:
+            return False
+        elif op == OP_STORE_FAST:
+            value = stack.pop()
+            self._flush()
+            self.lines.append(f'frame[{arg}] = {value.source}')
+            self.written.add(arg)
+        elif op == OP_POP_TOP:
+            value = stack.pop()
+            if value.slots or not value.source.isidentifier():
+                self.lines.append(value.source)
+        elif op == OP_DUP_TOP:
+            name = self._materialize(stack.pop())
+            stack += [_Value(name), _Value(name)]
+        elif op == OP_NOT:
+            value = stack.pop()
+            stack.append(_Value(f'(not _truthy({value.source}))', value.slots))
+        elif op in _INLINE_OPERATORS or op in _HELPER_OPERATORS:
+            if len(stack) < 2:
+                return False
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(self._binary(op, left, right))
+        elif op == OP_BUILD_LIST:
+            if len(stack) < arg:
+                return False
+            values = stack[len(stack) - arg:]
+            del stack[len(stack) - arg:]
+            slots = frozenset().union(*[v.slots for v in values])
+            stack.append(_Value('[' + ', '.join(v.source for v in values) + ']', slots))
+        elif op == OP_CALL_BUILTIN:
+            _, nargs, func = arg
+            if len(stack) < nargs:
+                return False
+            values = stack[len(stack) - nargs:]
+            del stack[len(stack) - nargs:]
+            self._flush()
+            result = self._temp()
+            unary = getattr(func, 'unary', None)
+            if unary is not None and nargs == 1:
+                self.lines.append(f'{result} = {self._const(unary)}({values[0].source})')
+            else:
+                name = self._const(func)
+                self.lines.append(f"{result} = {name}([{', '.join(v.source for v in values)}])")
+            stack.append(_Value(result))
+        elif op == OP_PRINT:
+            count, end = arg
+            if len(stack) < count:
+                return False
+            values = stack[len(stack) - count:]
+            del stack[len(stack) - count:]
+            self._flush()
+            parts = [f'_text({v.source})' for v in values]
+            if end or not parts:
+                parts.append(repr(end))
+            parts = ' + '.join(parts)
+            self.lines.append(f'vm._write({parts})')
+        else:
+            return False
+        return True
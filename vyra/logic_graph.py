@@ -4,20 +4,62 @@ Converts AST to a deterministic control flow graph for execution.
 """
 
 import json
+import sys
 import networkx as nx
 from typing import Dict, List, Any, Optional
 from .ast_nodes import *
 
 
+# Fields the interpreter reads from each node type's data, as (key, default).
+# GraphNode.args holds their values in this order.
+NODE_FIELDS = {
+    'assignment': (('variable', None), ('value', None)),
+    'output': (('expressions', ()), ('newline', True)),
+    'input': (('prompt', ''), ('variable', None), ('input_type', 'string')),
+    'if': (('condition', None),),
+    'while': (('condition', None),),
+    'for_setup': (('iterator', None), ('iterable', None)),
+    'for_condition': (('iterator', None),),
+    'repeat_setup': (('count', None),),
+    'function_def': (('name', None), ('parameters', ()), ('body', ())),
+    'function_call': (('function', None), ('arguments', ())),
+    'return': (('value', None),),
+    'file_read': (('filepath', None), ('variable', None), ('mode', 'text')),
+    'file_write': (('filepath', None), ('content', None), ('mode', 'text')),
+    'list_append': (('list', None), ('value', None)),
+}
+
+# Small integer for each node type (GraphNode.kind), so handler tables can
+# be lists indexed by kind; types not listed get UNKNOWN_KIND
+NODE_KINDS = {node_type: kind for kind, node_type in enumerate((
+    'entry', 'exit', 'assignment', 'output', 'input', 'if', 'then_entry', 'else_entry',
+    'merge', 'while', 'for_setup', 'for_condition', 'repeat_setup', 'repeat_condition',
+    'loop_exit', 'break', 'continue', 'function_def', 'function_call', 'return',
+    'file_read', 'file_write', 'list_append',
+))}
+UNKNOWN_KIND = len(NODE_KINDS)
+
+
 class GraphNode:
     """Node in the logic graph"""
     
+    __slots__ = ('id', 'type', 'kind', 'data', 'args', 'successors', 'predecessors', 'then_next',
+                 'else_next', 'next_id')
+    
     def __init__(self, node_id: int, node_type: str, data: Dict[str, Any]):
         self.id = node_id
-        self.type = node_type
+        # Interned so handler-table lookups compare by identity
+        self.type = sys.intern(node_type)
+        self.kind = NODE_KINDS.get(node_type, UNKNOWN_KIND)
         self.data = data
+        self.args = tuple(data.get(key, default) for key, default in NODE_FIELDS.get(node_type, ()))
         self.successors = []
         self.predecessors = []
+        # Successor (a break/continue's jump target) and branch targets for
+        # if/loop nodes, kept up to date by LogicGraph.add_edge
+        self.next_id: Optional[int] = None
+        self.then_next: Optional[int] = None
+        self.else_next: Optional[int] = None
     
     def to_dict(self) -> Dict:
         return {
@@ -64,6 +106,35 @@ class LogicGraph:
         self.nodes[from_node_id].successors.append(to_node_id)
         self.nodes[to_node_id].predecessors.append(from_node_id)
         self.graph.add_edge(from_node_id, to_node_id, type=edge_type)
+        self._link_branches(self.nodes[from_node_id])
+    
+    def _link_branches(self, node: GraphNode):
+        """Precompute where a node continues when its test is true / false
+        
+        True goes to the 'then' edge (or the first non-exit edge, i.e. a loop
+        body); false goes to 'else', then 'else_skip', then 'exit'. Either
+        falls back to the first successor. Also records where break/continue
+        jump to.
+        """
+        typed = [(succ_id, self.graph[node.id][succ_id].get('type')) for succ_id in node.successors]
+        default = node.successors[0] if node.successors else None
+        
+        def first(*edge_types):
+            for wanted in edge_types:
+                for succ_id, edge_type in typed:
+                    if edge_type == wanted:
+                        return succ_id
+            return None
+        
+        then_next = first('then')
+        if then_next is None:
+            then_next = next((succ_id for succ_id, edge_type in typed if edge_type != 'exit'), default)
+        else_next = first('else', 'else_skip', 'exit')
+        
+        jump = first('break_to', 'continue_to')
+        node.next_id = default if jump is None else jump
+        node.then_next = then_next
+        node.else_next = default if else_next is None else else_next
     
     def to_dict(self) -> Dict:
         """Serialize graph to dictionary"""
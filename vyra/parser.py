@@ -4,11 +4,98 @@ Uses pattern matching and NLP-style heuristics to understand natural language co
 """
 
 import re
+import sys
 import difflib
+import threading
+from bisect import bisect_left
+from functools import lru_cache
 from typing import List, Optional, Tuple, Dict, Any
 from .ast_nodes import *
 
 
+# A pattern's possible first words: a literal word or (?:a|b) group followed by
+# whitespace. Patterns without one can match lines starting with anything.
+_LEADING_WORDS = re.compile(r'(?:([a-z]+)|\(\?:([a-z|]+)\))\\s')
+
+# Compiled action tables by their (category, patterns) source, shared by parsers
+_COMPILED_ACTION_PATTERNS: Dict[tuple, Dict[str, List[Tuple[re.Pattern, str]]]] = {}
+
+# Combined action regexes by (first word, action patterns), shared by parsers
+_ACTION_BUCKETS: Dict[Tuple[str, tuple], Tuple[re.Pattern, list]] = {}
+
+# One reusable parser per thread, for parse()
+_thread_parsers = threading.local()
+
+# Statements common enough to be recognised without the regex engine, by
+# first word; see VyraParser._match_common_statement
+_DISPLAY_WORDS = frozenset(('display', 'show', 'print', 'say'))
+_STEP_WORDS = frozenset(('increment', 'decrement'))
+_BARE_STATEMENTS = {'break': 'break', 'stop': 'break', 'continue': 'continue',
+                    'exit': 'return_void', 'return': 'return_void'}
+_WORD = re.compile(r'\w+')
+
+# Expression forms matched on every expression parse
+_CALL_EXPRESSION = re.compile(r'^(?:call|run)\s+(\w+)(?:\s+with\s+(.+))?$', re.IGNORECASE)
+_VALUE_OF = re.compile(r'the\s+value\s+of\s+(\w+)', re.IGNORECASE)
+_CALL_START = re.compile(r'(?:call|run)\s', re.IGNORECASE)
+_PARAMETER_SEPARATOR = re.compile(r'\s*(?:,| and )\s*')
+
+# Binding strength of the arithmetic operators
+_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2, '**': 3}
+
+# Text clean-up used when suggesting corrections for unrecognised lines
+_WHITESPACE = re.compile(r'\s+')
+_NOT_COMPARABLE = re.compile(r'[^a-z0-9 :]+')
+_PLACEHOLDER = re.compile(r'<[^>]+>')
+
+# Statements that assign the result of one arithmetic operation, by action
+# type: (operator, left operand, right operand, group of the target variable).
+# An operand is (group, is_name): names become variables as written, other
+# groups are parsed as expressions. None takes the operator from the first word.
+_ARITHMETIC_STATEMENTS = {
+    'add_to': ('+', (2, True), (1, False), 2),
+    'subtract_from': ('-', (2, True), (1, False), 2),
+    'multiply_by': ('*', (1, True), (2, False), 1),
+    'divide_by': ('/', (1, True), (2, False), 1),
+    'subtract_store': ('-', (2, True), (1, False), 3),
+    'divide_store': ('/', (1, True), (2, True), 3),
+    'binary_op_store': (None, (1, False), (2, False), 3),
+}
+_STORE_OPERATORS = {'add': '+', 'multiply': '*', 'times': '*'}
+
+# Literals common enough to share one node; literal nodes (and the empty
+# list's value) are never mutated
+_LIT_ZERO = LiteralNode(NodeType.NUMBER, value=0)
+_LIT_ONE = LiteralNode(NodeType.NUMBER, value=1)
+_LIT_NULL = LiteralNode(NodeType.NULL, value=None)
+_LIT_TRUE = LiteralNode(NodeType.BOOLEAN, value=True)
+_LIT_FALSE = LiteralNode(NodeType.BOOLEAN, value=False)
+_LIT_EMPTY_LIST = LiteralNode(NodeType.LIST, value=[])
+_NUMBER_LITERALS = {'0': _LIT_ZERO, '1': _LIT_ONE}
+
+
+class _Captures:
+    """The groups of one action pattern, numbered from 1 and read like a re.Match"""
+    __slots__ = ('captured', 'lastindex')
+
+    def __init__(self, *captured: str):
+        self.captured = captured
+        self.lastindex = len(captured)
+
+    @classmethod
+    def of(cls, groups: tuple) -> '_Captures':
+        """Captures for a pattern's slice of a combined match's groups (None if unmatched)"""
+        captures = cls(*groups)
+        lastindex = len(groups)
+        while lastindex and groups[lastindex - 1] is None:
+            lastindex -= 1
+        captures.lastindex = lastindex or None
+        return captures
+
+    def group(self, index: int) -> str:
+        return self.captured[index - 1]
+
+
 class VyraParser:
     """
     Parses natural English sentences into an Abstract Syntax Tree (AST).
@@ -20,9 +107,19 @@ class VyraParser:
         self.indent_stack = [0]
         self.errors = []
         self.known_list_vars = set()
+        # Parsed expressions and conditions by source text, for the current parse
+        self._expression_cache: Dict[str, ASTNode] = {}
+        self._condition_cache: Dict[str, ASTNode] = {}
+        # Call nodes built so far; results holding one (it has a line number) are not cached
+        self._calls_parsed = 0
         
         # Action verb mappings
         self.action_patterns = self._build_action_patterns()
+        self._actions = [entry for entries in self.action_patterns.values() for entry in entries]
+        self._action_first_words = [self._leading_words(pattern) for pattern, _ in self._actions]
+        self._known_first_words = set().union(*filter(None, self._action_first_words))
+        self._actions_key = tuple((pattern.pattern, action_type) for pattern, action_type in self._actions)
+        self._action_buckets: Dict[str, Tuple[re.Pattern, List[Tuple[re.Pattern, str]]]] = {}
         
         # Operator mappings
         self.comparison_ops = {
@@ -48,6 +145,23 @@ class VyraParser:
             'and': 'and', 'or': 'or', 'not': 'not'
         }
 
+        # Operator scans, compiled once. Comparison and logical phrases are
+        # tried in table order (comparisons longest first). Arithmetic phrases
+        # are found in one left-to-right pass that steps over quoted strings
+        # and [lists]; group 1 is the phrase when one matched.
+        self._arithmetic_tokens = re.compile(
+            r'"[^"]*"|\'[^\']*\'|\[[^\]]*\]|\b('
+            + '|'.join(re.escape(phrase) for phrase in sorted(self.arithmetic_ops, key=len, reverse=True))
+            + r')\b', re.IGNORECASE)
+        self._comparison_scan = [
+            (phrase, re.compile(re.escape(phrase), re.IGNORECASE), self.comparison_ops[phrase])
+            for phrase in sorted(self.comparison_ops, key=len, reverse=True)
+        ]
+        self._logical_scan = [
+            (f' {phrase} ', re.compile(rf'\s+{re.escape(phrase)}\s+', re.IGNORECASE), symbol)
+            for phrase, symbol in self.logical_ops.items()
+        ]
+
         # Suggestion templates for unknown statements (used only for error messages)
         self._suggestion_templates: List[str] = [
             'Set <variable> to <value>',
@@ -85,9 +199,9 @@ class VyraParser:
         ]
 
     
-    def _build_action_patterns(self) -> Dict[str, List[Tuple[str, str]]]:
-        """Build regex patterns for action recognition"""
-        return {
+    def _build_action_patterns(self) -> Dict[str, List[Tuple[re.Pattern, str]]]:
+        """Build regex patterns for action recognition, compiled once per table and shared"""
+        patterns = {
             # Variable creation and assignment
             'create': [
                 (r'create\s+(?:an\s+|a\s+)?list\s+called\s+(\w+)(?:\s+with\s+values?\s+(.+))?', 'create_list'),
@@ -182,16 +296,69 @@ class VyraParser:
                 (r'the\s+length\s+of\s+(\w+)', 'list_length'),
             ],
         }
+        key = tuple((category, tuple(entries)) for category, entries in patterns.items())
+        compiled = _COMPILED_ACTION_PATTERNS.get(key)
+        if compiled is None:
+            compiled = _COMPILED_ACTION_PATTERNS[key] = {
+                category: [(re.compile(pattern, re.IGNORECASE), action_type) for pattern, action_type in entries]
+                for category, entries in patterns.items()
+            }
+        return {category: list(entries) for category, entries in compiled.items()}
     
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _leading_words(pattern: re.Pattern) -> Optional[frozenset]:
+        """First words a line must start with to match pattern (None if any)"""
+        match = _LEADING_WORDS.match(pattern.pattern)
+        if match is None:
+            return None
+        return frozenset((match.group(1) or match.group(2)).split('|'))
+
+    def _actions_for(self, first_word: str) -> Tuple[re.Pattern, List[Tuple[re.Pattern, str]], Dict[str, Tuple[int, int, str]]]:
+        """One alternation of the action patterns a line starting with first_word can match
+
+        Patterns keep their order, so the first one that matches still wins;
+        the named group a<index> that matched says which one it was. The
+        third item maps that name to the pattern's own groups, as a
+        (start, end) slice of match.groups(), and its action type.
+        """
+        if first_word not in self._known_first_words:
+            first_word = ''
+        cached = self._action_buckets.get(first_word)
+        if cached is None:
+            key = (first_word, self._actions_key)
+            cached = _ACTION_BUCKETS.get(key)
+            if cached is None:
+                actions = [action for action, words in zip(self._actions, self._action_first_words)
+                           if words is None or first_word in words]
+                action_re = re.compile('|'.join(
+                    f'(?P<a{index}>{pattern.pattern})' for index, (pattern, _) in enumerate(actions)
+                ), re.IGNORECASE)
+                spans = {}
+                for name, number in action_re.groupindex.items():
+                    pattern, action_type = actions[int(name[1:])]
+                    spans[name] = (number, number + pattern.groups, action_type)
+                cached = _ACTION_BUCKETS[key] = (action_re, actions, spans)
+            self._action_buckets[first_word] = cached
+        return cached
+
     def parse(self, source_code: str) -> ProgramNode:
         """
         Main entry point - parse Vyra source code into AST
         """
         self.errors = []
         self.known_list_vars = set()
+        self._expression_cache = {}
+        self._condition_cache = {}
 
-        lines = source_code.strip().split('\n')
-        statements = self._parse_statements_from_lines(lines)
+        # Each line is split off, stripped and measured once; blocks are lists
+        # of line indices
+        source_lines = source_code.strip().split('\n')
+        self._line_text = [line.strip() for line in source_lines]
+        self._line_indent = [len(line) - len(line.lstrip()) for line in source_lines]
+        self._block_end = self._find_block_ends()
+        self._all_lines = list(range(len(source_lines)))
+        statements = self._parse_statements_from_lines(self._all_lines)
         
         return ProgramNode(
             node_type=NodeType.PROGRAM,
@@ -205,47 +372,56 @@ class VyraParser:
             if isinstance(statement.value, LiteralNode) and statement.value.node_type == NodeType.LIST:
                 self.known_list_vars.add(statement.variable_name)
 
-    def _parse_statements_from_lines(self, lines: List[str]) -> List[ASTNode]:
-        """Parse a list of lines into a list of AST statements (supports nested blocks)."""
+    def _parse_statements_from_lines(self, lines: List[int]) -> List[ASTNode]:
+        """Parse the source lines at the given indices into AST statements (supports nested blocks)."""
         statements: List[ASTNode] = []
+        append = statements.append
+        line_text = self._line_text
+        count = len(lines)
         i = 0
-        while i < len(lines):
-            raw_line = lines[i]
-            line = raw_line.strip()
+        while i < count:
+            line = line_text[lines[i]]
             self.current_line = i + 1
 
             # Skip empty lines and comments
-            if not line or line.startswith('#') or line.lower().startswith('note:'):
+            if not line or line.startswith('#') or line[:5].lower() == 'note:':
                 i += 1
                 continue
 
             statement, lines_consumed = self._parse_statement(lines, i)
             if statement:
-                statements.append(statement)
+                append(statement)
                 self._record_statement_effects(statement)
 
             i += max(lines_consumed, 1)
 
         return statements
     
-    def _parse_statement(self, lines: List[str], start_idx: int) -> Tuple[Optional[ASTNode], int]:
+    def _parse_statement(self, lines: List[int], start_idx: int) -> Tuple[Optional[ASTNode], int]:
         """Parse a single statement, potentially spanning multiple lines"""
-        line = lines[start_idx].strip()
-        
-        # Remove trailing period if present
-        if line.endswith('.'):
-            line = line[:-1].strip()
-        
-        # Try to match action patterns
-        for category, patterns in self.action_patterns.items():
-            for pattern, action_type in patterns:
-                match = re.match(pattern, line, re.IGNORECASE)
-                if match:
-                    # Check if this is a block statement (ends with :)
-                    if line.endswith(':'):
-                        return self._parse_block_statement(lines, start_idx, action_type, match)
-                    else:
-                        return self._parse_simple_statement(line, action_type, match), 1
+        line = self._line_text[lines[start_idx]]
+        
+        # Remove trailing period if present (lines are non-empty and already stripped)
+        if line[-1] == '.':
+            line = line[:-1].rstrip()
+        
+        # Try to match the action patterns a line with this first word can match
+        first_word = line.split(None, 1)[0].lower() if line else ''
+        found = self._match_common_statement(first_word, line)
+        if found is None:
+            action_re, _, spans = self._actions_for(first_word)
+            found = action_re.match(line)
+            if found:
+                # Renumber the matched pattern's groups from 1
+                start, end, action_type = spans[found.lastgroup]
+                found = (action_type, _Captures.of(found.groups()[start:end]))
+        if found:
+            action_type, match = found
+            # Check if this is a block statement (ends with :)
+            if line[-1:] == ':':
+                return self._parse_block_statement(lines, start_idx, action_type, match)
+            else:
+                return self._parse_simple_statement(line, action_type, match), 1
         
         # If no pattern matched, try to parse as expression or error
         self.errors.append(f"Line {self.current_line}: Could not understand: '{line}'")
@@ -254,10 +430,38 @@ class VyraParser:
             self.errors.append(f"  Did you mean: {suggestion}?")
         return None, 1
 
+    @staticmethod
+    def _match_common_statement(first_word: str, line: str) -> Optional[Tuple[str, '_Captures']]:
+        """(action type, groups) for the most common statement shapes, else None
+
+        Handles 'set <name> to <value>', 'display <value>' (and show, print,
+        say), 'increment/decrement <name>' and the one-word statements
+        (break, stop, continue, exit, return) by splitting on whitespace,
+        only when the result is certain to be what the action patterns give:
+        the first pattern they would match and the same groups. Anything
+        else goes to the patterns.
+        """
+        if first_word == 'set':
+            parts = line.split(None, 3)
+            if len(parts) == 4 and parts[2].lower() == 'to' and _WORD.fullmatch(parts[1]):
+                return 'assign', _Captures(parts[1], parts[3])
+        elif first_word in _DISPLAY_WORDS:
+            parts = line.split(None, 1)
+            # 'display = x' is an assignment to a variable called display
+            if len(parts) == 2 and not parts[1].startswith('='):
+                return 'display', _Captures(parts[1])
+        elif first_word in _STEP_WORDS:
+            parts = line.split(None, 2)
+            if len(parts) >= 2 and _WORD.fullmatch(parts[1]):
+                return first_word, _Captures(parts[1])
+        elif first_word in _BARE_STATEMENTS and len(line) == len(first_word):
+            return _BARE_STATEMENTS[first_word], _Captures()
+        return None
+
     def _normalize_for_suggestion(self, text: str) -> str:
         text = text.strip().lower()
         text = text.replace('\t', ' ')
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE.sub(' ', text)
         # Keep ':' because it's meaningful for blocks, but drop trailing '.' for matching
         if text.endswith('.'):
             text = text[:-1].strip()
@@ -315,11 +519,11 @@ class VyraParser:
         # General template matching against common statements
         scored: List[Tuple[float, str]] = []
         # Remove placeholders for matching
-        comparable_line = re.sub(r'[^a-z0-9 :]+', '', line)
+        comparable_line = _NOT_COMPARABLE.sub('', line)
         for template in self._suggestion_templates:
             comparable_template = template.lower()
-            comparable_template = re.sub(r'<[^>]+>', '', comparable_template)
-            comparable_template = re.sub(r'\s+', ' ', comparable_template).strip()
+            comparable_template = _PLACEHOLDER.sub('', comparable_template)
+            comparable_template = _WHITESPACE.sub(' ', comparable_template).strip()
             ratio = difflib.SequenceMatcher(None, comparable_line, comparable_template).ratio()
             scored.append((ratio, template))
 
@@ -335,9 +539,9 @@ class VyraParser:
         """Parse non-block statements"""
         
         if action_type == 'create_var':
-            var_name = match.group(1)
+            var_name = sys.intern(match.group(1))
             value_str = match.group(2) if match.lastindex >= 2 else None
-            value = self._parse_expression(value_str) if value_str else LiteralNode(NodeType.NULL, value=None)
+            value = self._parse_expression(value_str) if value_str else _LIT_NULL
             return AssignmentNode(
                 node_type=NodeType.ASSIGNMENT,
                 variable_name=var_name,
@@ -353,9 +557,9 @@ class VyraParser:
                 value = self._parse_expression(values_str)
                 # If user didn't use [..] syntax, fall back to empty list
                 if not (isinstance(value, LiteralNode) and value.node_type == NodeType.LIST):
-                    value = LiteralNode(NodeType.LIST, value=[])
+                    value = _LIT_EMPTY_LIST
             else:
-                value = LiteralNode(NodeType.LIST, value=[])
+                value = _LIT_EMPTY_LIST
 
             return AssignmentNode(
                 node_type=NodeType.ASSIGNMENT,
@@ -386,115 +590,29 @@ class VyraParser:
                 line_number=self.current_line
             )
         
-        elif action_type == 'binary_op_store':
-            left_str = match.group(1)
-            right_str = match.group(2)
-            result_var = match.group(3)
-            
-            # Determine operator from the line
-            operator = '+'
-            line_lower = line.lower()
-            if 'multiply' in line_lower or 'times' in line_lower:
-                operator = '*'
-            elif 'subtract' in line_lower or 'minus' in line_lower:
-                operator = '-'
-            elif 'divide' in line_lower:
-                operator = '/'
-            
-            left = self._parse_expression(left_str)
-            right = self._parse_expression(right_str)
-            
-            binary_op = BinaryOpNode(
-                node_type=NodeType.BINARY_OP,
-                operator=operator,
-                left=left,
-                right=right,
-                line_number=self.current_line
-            )
-            
-            return AssignmentNode(
-                node_type=NodeType.ASSIGNMENT,
-                variable_name=result_var,
-                value=binary_op,
-                line_number=self.current_line
-            )
-        
-        elif action_type in ['add_to', 'multiply_by', 'divide_by', 'subtract_from', 'subtract_store', 'divide_store']:
-            if action_type == 'add_to':
-                value_str = match.group(1)
-                var_name = match.group(2)
-                operator = '+'
-
-                # Disambiguation: if target is a known list, treat as append
-                if var_name in self.known_list_vars:
-                    value_node = self._parse_expression(value_str)
-                    list_node = VariableNode(NodeType.VARIABLE, name=var_name)
-                    return ListAppendNode(
-                        node_type=NodeType.LIST_APPEND,
-                        list_var=list_node,
-                        value=value_node,
-                        line_number=self.current_line
-                    )
-            elif action_type == 'subtract_from':
-                value_str = match.group(1)
-                var_name = match.group(2)
-                operator = '-'
-            elif action_type == 'subtract_store':
-                value_str = match.group(1)
-                var_name2 = match.group(2)
-                result_var = match.group(3)
-                var_node = VariableNode(NodeType.VARIABLE, name=var_name2)
-                value_node = self._parse_expression(value_str)
-                binary_op = BinaryOpNode(
-                    node_type=NodeType.BINARY_OP,
-                    operator='-',
-                    left=var_node,
-                    right=value_node,
-                    line_number=self.current_line
-                )
-                return AssignmentNode(
-                    node_type=NodeType.ASSIGNMENT,
-                    variable_name=result_var,
-                    value=binary_op,
-                    line_number=self.current_line
-                )
-            elif action_type == 'divide_store':
-                var_name1 = match.group(1)
-                var_name2 = match.group(2)
-                result_var = match.group(3)
-                left_node = VariableNode(NodeType.VARIABLE, name=var_name1)
-                right_node = VariableNode(NodeType.VARIABLE, name=var_name2)
-                binary_op = BinaryOpNode(
-                    node_type=NodeType.BINARY_OP,
-                    operator='/',
-                    left=left_node,
-                    right=right_node,
-                    line_number=self.current_line
-                )
-                return AssignmentNode(
-                    node_type=NodeType.ASSIGNMENT,
-                    variable_name=result_var,
-                    value=binary_op,
+        elif action_type in _ARITHMETIC_STATEMENTS:
+            operator, left_operand, right_operand, target = _ARITHMETIC_STATEMENTS[action_type]
+            if operator is None:
+                # 'add ... and store' or 'multiply/times ... and store'
+                operator = _STORE_OPERATORS[line.split(None, 1)[0].lower()]
+            var_name = match.group(target)
+
+            # Disambiguation: if target is a known list, treat as append
+            if action_type == 'add_to' and var_name in self.known_list_vars:
+                value_node = self._parse_expression(match.group(1))
+                list_node = VariableNode(NodeType.VARIABLE, name=var_name)
+                return ListAppendNode(
+                    node_type=NodeType.LIST_APPEND,
+                    list_var=list_node,
+                    value=value_node,
                     line_number=self.current_line
                 )
-            elif action_type == 'multiply_by':
-                var_name = match.group(1)
-                value_str = match.group(2)
-                operator = '*'
-            elif action_type == 'divide_by':
-                var_name = match.group(1)
-                value_str = match.group(2)
-                operator = '/'
-            
-            if action_type in ['add_to', 'subtract_from', 'multiply_by', 'divide_by']:
-                var_node = VariableNode(NodeType.VARIABLE, name=var_name)
-                value_node = self._parse_expression(value_str)
-            
+
             binary_op = BinaryOpNode(
                 node_type=NodeType.BINARY_OP,
                 operator=operator,
-                left=var_node,
-                right=value_node,
+                left=self._parse_operand(match, *left_operand),
+                right=self._parse_operand(match, *right_operand),
                 line_number=self.current_line
             )
             
@@ -506,11 +624,11 @@ class VyraParser:
             )
         
         elif action_type in ['increment', 'decrement']:
-            var_name = match.group(1)
+            var_name = sys.intern(match.group(1))
             operator = '+' if action_type == 'increment' else '-'
             
             var_node = VariableNode(NodeType.VARIABLE, name=var_name)
-            one_node = LiteralNode(NodeType.NUMBER, value=1)
+            one_node = _LIT_ONE
             
             binary_op = BinaryOpNode(
                 node_type=NodeType.BINARY_OP,
@@ -533,7 +651,8 @@ class VyraParser:
             
             # Clean up prompt text
             prompt_text = prompt_text.replace('_', ' ').replace('their ', '').replace('a ', '')
-            is_password = 'password' in line.lower() and 'without showing' in line.lower()
+            line_lower = line.lower()
+            is_password = 'password' in line_lower and 'without showing' in line_lower
             
             return InputNode(
                 node_type=NodeType.INPUT,
@@ -649,7 +768,13 @@ class VyraParser:
         
         return None
     
-    def _parse_block_statement(self, lines: List[str], start_idx: int, action_type: str, match) -> Tuple[Optional[ASTNode], int]:
+    def _parse_operand(self, match, group: int, is_name: bool) -> ASTNode:
+        """A statement's operand: a variable named by the group, or the group parsed as an expression"""
+        if is_name:
+            return VariableNode(NodeType.VARIABLE, name=match.group(group))
+        return self._parse_expression(match.group(group))
+
+    def _parse_block_statement(self, lines: List[int], start_idx: int, action_type: str, match) -> Tuple[Optional[ASTNode], int]:
         """Parse block statements (if, while, for, function)"""
         
         # Find the indented block
@@ -736,7 +861,7 @@ class VyraParser:
             
             parameters = []
             if params_str:
-                parameters = [p.strip() for p in params_str.replace(' and ', ',').split(',')]
+                parameters = [sys.intern(p) for p in _PARAMETER_SEPARATOR.split(params_str.strip())]
             
             body_statements = self._parse_statements_from_lines(block_lines)
             
@@ -750,42 +875,78 @@ class VyraParser:
         
         return None, lines_consumed
     
-    def _extract_block(self, lines: List[str], start_idx: int) -> Tuple[List[str], int]:
-        """Extract indented block of code"""
+    def _find_block_ends(self) -> List[int]:
+        """For each non-empty line, the index of the next non-empty line indented less
+
+        That is where a block whose first line it is ends (the line count if
+        it runs to the end). Found for all lines in one pass with a stack of
+        lines still waiting for their end.
+        """
+        line_text, line_indent = self._line_text, self._line_indent
+        block_end = [len(line_text)] * len(line_text)
+        waiting: List[int] = []
+        for index, text in enumerate(line_text):
+            if text:
+                indent = line_indent[index]
+                while waiting and line_indent[waiting[-1]] > indent:
+                    block_end[waiting.pop()] = index
+                waiting.append(index)
+        return block_end
+
+    def _extract_block(self, lines: List[int], start_idx: int) -> Tuple[List[int], int]:
+        """Extract indented block of code (as indices of its source lines)"""
         block_lines = []
         i = start_idx
+        line_text, line_indent = self._line_text, self._line_indent
         
         # Determine base indentation
         if i < len(lines):
-            first_line = lines[i]
-            base_indent = len(first_line) - len(first_line.lstrip())
+            base_indent = line_indent[lines[i]]
         else:
             return block_lines, 1
         
-        # Collect all lines with greater or equal indentation (dedent by base_indent,
-        # but keep deeper indentation so nested blocks can be parsed correctly).
+        # A block starting at a non-empty line ends where _find_block_ends
+        # says. lines holds every non-empty line in its range, so that is a
+        # bisection; only the whole program's list also holds empty lines.
+        if line_text[lines[i]]:
+            stop = bisect_left(lines, self._block_end[lines[i]], i)
+            block_lines = lines[i:stop]
+            if lines is self._all_lines:
+                block_lines = [index for index in block_lines if line_text[index]]
+            return block_lines, stop - start_idx
+        
+        # Collect all lines with greater or equal indentation. Indents are
+        # compared on the original lines, so nested blocks need no dedenting.
         while i < len(lines):
-            line = lines[i]
-            if not line.strip():  # Skip empty lines
+            index = lines[i]
+            if not line_text[index]:  # Skip empty lines
                 i += 1
                 continue
             
-            current_indent = len(line) - len(line.lstrip())
-            
-            if current_indent < base_indent:
+            if line_indent[index] < base_indent:
                 break  # End of block
 
-            block_lines.append(line[base_indent:])
+            block_lines.append(index)
             i += 1
 
         return block_lines, i - start_idx
     
     def _parse_expression(self, expr_str: str) -> ASTNode:
+        """Parse an expression (literal, variable, operation), reusing earlier parses of the same text"""
+        node = self._expression_cache.get(expr_str)
+        if node is None:
+            calls = self._calls_parsed
+            node = self._parse_new_expression(expr_str)
+            if self._calls_parsed == calls:
+                self._expression_cache[expr_str] = node
+        return node
+
+    def _parse_new_expression(self, expr_str: str) -> ASTNode:
         """Parse an expression (literal, variable, operation)"""
         expr_str = expr_str.strip()
 
         # Allow function calls inside expressions (e.g., "call add with 1 and 2")
-        call_match = re.match(r'^(?:call|run)\s+(\w+)(?:\s+with\s+(.+))?$', expr_str, re.IGNORECASE)
+        call_match = _CALL_EXPRESSION.match(expr_str)
         if call_match:
             func_name = call_match.group(1)
             args_str = call_match.group(2)
@@ -793,6 +954,7 @@ class VyraParser:
             if args_str:
                 arg_parts = self._split_args(args_str)
                 arguments = [self._parse_expression(arg) for arg in arg_parts if arg]
+            self._calls_parsed += 1
             return FunctionCallNode(
                 node_type=NodeType.FUNCTION_CALL,
                 function_name=func_name,
@@ -822,6 +984,8 @@ class VyraParser:
             return LiteralNode(NodeType.STRING, value=expr_str[1:-1])
         
         # Number literal
+        if expr_str in _NUMBER_LITERALS:
+            return _NUMBER_LITERALS[expr_str]
         try:
             if '.' in expr_str:
                 return LiteralNode(NodeType.NUMBER, value=float(expr_str))
@@ -831,45 +995,88 @@ class VyraParser:
             pass
         
         # Boolean literal
-        if expr_str.lower() in ['true', 'yes']:
-            return LiteralNode(NodeType.BOOLEAN, value=True)
-        if expr_str.lower() in ['false', 'no']:
-            return LiteralNode(NodeType.BOOLEAN, value=False)
+        lowered = expr_str.lower()
+        if lowered in ('true', 'yes'):
+            return _LIT_TRUE
+        if lowered in ('false', 'no'):
+            return _LIT_FALSE
         
         # List literal
         if expr_str.startswith('[') and expr_str.endswith(']'):
             list_str = expr_str[1:-1]
             if not list_str.strip():
-                return LiteralNode(NodeType.LIST, value=[])
+                return _LIT_EMPTY_LIST
             elements = [self._parse_expression(e.strip()) for e in list_str.split(',')]
             return LiteralNode(NodeType.LIST, value=elements)
         
         # Check for binary operations in natural language
-        for op_phrase, op_symbol in self.arithmetic_ops.items():
-            # Only treat as an operator when it appears as a standalone phrase,
-            # and both sides of the split are non-empty.
-            if re.search(rf'\b{re.escape(op_phrase)}\b', expr_str, re.IGNORECASE):
-                parts = re.split(re.escape(op_phrase), expr_str, flags=re.IGNORECASE, maxsplit=1)
-                if len(parts) == 2:
-                    left_part = parts[0].strip()
-                    right_part = parts[1].strip()
-                    if left_part and right_part:
-                        left = self._parse_expression(left_part)
-                        right = self._parse_expression(right_part)
-                        return BinaryOpNode(
-                            node_type=NodeType.BINARY_OP,
-                            operator=op_symbol,
-                            left=left,
-                            right=right
-                        )
+        arithmetic = self._split_arithmetic(expr_str)
+        if arithmetic:
+            return self._combine_arithmetic(*arithmetic)
         
         # Check for "the value of x" pattern
-        value_match = re.match(r'the\s+value\s+of\s+(\w+)', expr_str, re.IGNORECASE)
+        value_match = _VALUE_OF.match(expr_str)
         if value_match:
-            return VariableNode(NodeType.VARIABLE, name=value_match.group(1))
+            return VariableNode(NodeType.VARIABLE, name=sys.intern(value_match.group(1)))
         
         # Default to variable reference
-        return VariableNode(NodeType.VARIABLE, name=expr_str)
+        return VariableNode(NodeType.VARIABLE, name=sys.intern(expr_str))
+
+    def _split_arithmetic(self, expr_str: str) -> Optional[Tuple[List[str], List[str]]]:
+        """Split an expression into operand texts and the operator symbols between them
+
+        Returns None when there is no arithmetic phrase, or when one has
+        nothing on a side of it. An operand that starts a call ('call f
+        with ...') takes the rest of the text as the call's arguments.
+        """
+        operands: List[str] = []
+        operators: List[str] = []
+        start = 0
+        for token in self._arithmetic_tokens.finditer(expr_str):
+            phrase = token.group(1)
+            if phrase is None:
+                continue
+            operand = expr_str[start:token.start()].strip()
+            if not operand:
+                return None
+            if _CALL_START.match(operand) and _CALL_EXPRESSION.match(expr_str[start:].strip()):
+                break
+            operands.append(operand)
+            operators.append(self.arithmetic_ops[phrase.lower()])
+            start = token.end()
+        if not operators:
+            return None
+        operand = expr_str[start:].strip()
+        if not operand:
+            return None
+        operands.append(operand)
+        return operands, operators
+
+    def _combine_arithmetic(self, operands: List[str], operators: List[str]) -> ASTNode:
+        """Build the operation tree by precedence climbing
+
+        '**' binds tightest and groups to the right; then '*', '/' and '%';
+        then '+' and '-'. Operators of equal precedence group to the left.
+        """
+        position = 0
+
+        def climb(min_precedence: int) -> ASTNode:
+            nonlocal position
+            left = self._parse_expression(operands[position])
+            while position < len(operators) and _PRECEDENCE[operators[position]] >= min_precedence:
+                operator = operators[position]
+                position += 1
+                precedence = _PRECEDENCE[operator]
+                right = climb(precedence if operator == '**' else precedence + 1)
+                left = BinaryOpNode(
+                    node_type=NodeType.BINARY_OP,
+                    operator=operator,
+                    left=left,
+                    right=right
+                )
+            return left
+
+        return climb(1)
 
     def _split_args(self, args_str: str) -> List[str]:
         """Split a function argument string on 'and' while respecting quotes/brackets."""
@@ -904,7 +1111,7 @@ class VyraParser:
                 elif ch in [']', ')', '}'] and depth > 0:
                     depth -= 1
 
-                if depth == 0 and s[i:i+5].lower() == ' and ':
+                if depth == 0 and ch == ' ' and s[i:i+5].lower() == ' and ':
                     parts.append(''.join(buf).strip())
                     buf = []
                     i += 5
@@ -920,14 +1127,25 @@ class VyraParser:
         return parts
     
     def _parse_condition(self, cond_str: str) -> ASTNode:
+        """Parse a condition expression, reusing earlier parses of the same text"""
+        node = self._condition_cache.get(cond_str)
+        if node is None:
+            calls = self._calls_parsed
+            node = self._parse_new_condition(cond_str)
+            if self._calls_parsed == calls:
+                self._condition_cache[cond_str] = node
+        return node
+
+    def _parse_new_condition(self, cond_str: str) -> ASTNode:
         """Parse a condition expression"""
         cond_str = cond_str.strip()
 
+        lowered = cond_str.lower()
+
         # Check for comparison operators (prefer longest match)
-        for op_phrase in sorted(self.comparison_ops.keys(), key=len, reverse=True):
-            op_symbol = self.comparison_ops[op_phrase]
-            if op_phrase in cond_str.lower():
-                parts = re.split(re.escape(op_phrase), cond_str, flags=re.IGNORECASE, maxsplit=1)
+        for op_phrase, op_split, op_symbol in self._comparison_scan:
+            if op_phrase in lowered:
+                parts = op_split.split(cond_str, maxsplit=1)
                 if len(parts) == 2:
                     left = self._parse_expression(parts[0].strip())
                     right = self._parse_expression(parts[1].strip())
@@ -939,9 +1157,9 @@ class VyraParser:
                     )
 
         # Check for logical operators (only after comparisons)
-        for op_phrase, op_symbol in self.logical_ops.items():
-            if f' {op_phrase} ' in cond_str.lower():
-                parts = re.split(rf'\s+{re.escape(op_phrase)}\s+', cond_str, flags=re.IGNORECASE, maxsplit=1)
+        for op_spaced, op_split, op_symbol in self._logical_scan:
+            if op_spaced in lowered:
+                parts = op_split.split(cond_str, maxsplit=1)
                 if len(parts) == 2:
                     left = self._parse_condition(parts[0].strip())
                     right = self._parse_condition(parts[1].strip())
@@ -963,3 +1181,17 @@ class VyraParser:
         
         # Single expression
         return [self._parse_expression(output_str)]
+
+
+def parse(source_code: str) -> Tuple[ProgramNode, List[str]]:
+    """Parse source code with this thread's parser; returns (program, errors)
+
+    Building a VyraParser compiles its patterns, which costs far more than
+    parsing a short program, so each thread keeps one. A parser's state is
+    reset by every parse, and no two threads ever share one.
+    """
+    parser = getattr(_thread_parsers, 'parser', None)
+    if parser is None:
+        parser = _thread_parsers.parser = VyraParser()
+    program = parser.parse(source_code)
+    return program, parser.errors